@@ -0,0 +1,195 @@
+"""轮询 / 下发指令热路径的微基准
+
+不启动 Home Assistant, 直接在 cassette (start_capture 服务录制的脱敏流量) 中的
+载荷上调用实体与配置流程中的纯函数, 报告每次调用耗时 (ns/op) 与峰值内存分配 (B/op)。
+与基线相比变慢超过阈值, 或没有基线时返回非零。基线与机器相关, 不纳入版本库。
+
+cassettes/sample.jsonl 为录制格式的示例, 建议换成自己设备的录制文件 (--cassette)。
+
+用法 (需要安装 homeassistant):
+
+    python benchmarks/bench_hot_paths.py --save-baseline # 记录当前结果为基线
+    python benchmarks/bench_hot_paths.py                 # 与基线对比
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+from urllib.parse import urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from custom_components.panasonic_smart_china.climate import (  # noqa: E402
+    URL_GET as URL_AC_GET,
+    PanasonicACEntity,
+)
+from custom_components.panasonic_smart_china.config_flow import (  # noqa: E402
+    URL_GET_DEV,
+    PanasonicConfigFlow,
+)
+from custom_components.panasonic_smart_china.const import DEFAULT_CONTROLLER_MODEL  # noqa: E402
+from custom_components.panasonic_smart_china.controllers import SUPPORTED_CONTROLLERS  # noqa: E402
+from custom_components.panasonic_smart_china.humidifier import (  # noqa: E402
+    HUMIDIFIER_PROFILE,
+    PanasonicHumidifierEntity,
+)
+
+BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_CASSETTE = os.path.join(HERE, "cassettes", "sample.jsonl")
+
+# 下发指令的典型变更 (用户输入, 不来自录制)
+AC_CHANGES = {"setTemperature": 50}
+HUMIDIFIER_CHANGES = {"setHumidity": 3}
+
+
+def load_payloads(path):
+    """从 cassette 中取出空调/加湿器最近一次状态与设备列表"""
+    ac_path = urlparse(URL_AC_GET).path
+    dev_path = urlparse(URL_GET_DEV).path
+    payloads = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            results = entry["r"].get("results") if isinstance(entry["r"], dict) else None
+            if not results:
+                continue
+            if entry["u"] == dev_path:
+                payloads["devices"] = {
+                    dev["deviceId"]: dev["params"] for dev in results["devList"]
+                }
+            elif entry["u"] == ac_path:
+                payloads["ac_status"] = results
+            elif "GetStatusInfo" in entry["u"]:
+                payloads["humidifier_status"] = results
+    missing = {"ac_status", "humidifier_status", "devices"} - payloads.keys()
+    if missing:
+        sys.exit(f"{path}: no recorded {', '.join(sorted(missing))}")
+    return payloads
+
+
+def _ac_entity():
+    """跳过 __init__ (需要 hass), 只设置热路径用到的字段"""
+    entity = PanasonicACEntity.__new__(PanasonicACEntity)
+    profile = SUPPORTED_CONTROLLERS[DEFAULT_CONTROLLER_MODEL]
+    entity._temp_scale = profile.get("temp_scale", 2)
+    entity._hvac_map = profile.get("hvac_mapping", {})
+    entity._fan_map = profile.get("fan_mapping", {})
+    entity._fan_overrides = profile.get("fan_payload_overrides", {})
+    return entity
+
+
+def _humidifier_entity():
+    entity = PanasonicHumidifierEntity.__new__(PanasonicHumidifierEntity)
+    entity._profile = HUMIDIFIER_PROFILE
+    entity._humidity_field = None
+    entity._target_humidity = 50
+    entity._current_humidity = None
+    return entity
+
+
+def build_cases(payloads):
+    """返回 {名称: 无参可调用对象}"""
+    ac = _ac_entity()
+    hum = _humidifier_entity()
+    flow = PanasonicConfigFlow.__new__(PanasonicConfigFlow)
+    ac_status, ac_changes = payloads["ac_status"], AC_CHANGES
+    hum_status, hum_changes = payloads["humidifier_status"], HUMIDIFIER_CHANGES
+    devices = list(payloads["devices"].items())
+    ac_id = next((did for did in payloads["devices"] if "_0900_" in did.upper()), devices[0][0])
+
+    def detect_device_type():
+        for did, info in devices:
+            flow._detect_device_type(did, info)
+
+    return {
+        "ac.update_local_state": lambda: ac._update_local_state(ac_status),
+        "ac.merge_params": lambda: ac._merge_params(ac_status, ac_changes),
+        "humidifier.update_local_state": lambda: hum._update_local_state(hum_status),
+        "humidifier.merge_params": lambda: hum._merge_params(hum_status, hum_changes),
+        "config_flow.generate_token": lambda: flow._generate_token(ac_id),
+        "config_flow.detect_device_type": detect_device_type,
+    }
+
+
+def measure(func, min_time):
+    """返回 (ns/op, 峰值分配 B/op)"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    # 取多轮中最快的一轮, 减少调度抖动的影响
+    repeat = max(3, int(min_time / 0.2))
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    tracemalloc.start()
+    try:
+        func()  # 预热缓存 (例如首次解析后记住的字段)
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        func()
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return best * 1e9, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="相对基线允许的最大耗时倍数")
+    parser.add_argument("--min-time", type=float, default=1.0,
+                        help="每个用例的大致测量时长 (秒)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--filter", default="", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE, help="录制的 cassette 文件")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.cassette)
+
+    baseline = {}
+    if not args.save_baseline:
+        if not os.path.exists(BASELINE):
+            print(f"No baseline at {BASELINE}, run with --save-baseline first")
+            return 2
+        with open(BASELINE, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'case':34} {'ns/op':>10} {'B/op':>8} {'vs base':>8}")
+    for name, func in build_cases(payloads).items():
+        if args.filter not in name:
+            continue
+        ns, alloc = measure(func, args.min_time)
+        results[name] = {"ns_per_op": round(ns, 1), "bytes_per_op": alloc}
+        ratio = ""
+        base = baseline.get(name)
+        if base:
+            r = ns / base["ns_per_op"]
+            ratio = f"{r:.2f}x"
+            if r > args.threshold:
+                regressions.append(name)
+        print(f"{name:34} {ns:10.0f} {alloc:8d} {ratio:>8}")
+
+    if args.save_baseline:
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline saved to {BASELINE}")
+        return 0
+
+    missing = [name for name in results if name not in baseline]
+    if missing:
+        print("No baseline for:", ", ".join(missing))
+        return 2
+    if regressions:
+        print(f"Regressed beyond {args.threshold:.2f}x:", ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""集成导入耗时基准
+
+用 `python -X importtime` 在子进程中导入集成包, 统计本集成模块的累计导入耗时,
+并检查只有配置流程 / 空调平台 / 服务才需要的模块没有被提前加载。
+HA 核心模块在真实运行时早已加载, 因此先行导入, 不计入本集成的耗时。
+
+用法 (需要安装 homeassistant):
+
+    python benchmarks/bench_import.py [--budget-ms 30] [--runs 5]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+PACKAGE = "custom_components.panasonic_smart_china"
+
+# 导入集成包时不应被加载的模块 (首次使用时才导入)
+DEFERRED = (
+    f"{PACKAGE}.config_flow",
+    f"{PACKAGE}.auth",
+    f"{PACKAGE}.controllers",
+    f"{PACKAGE}.climate",
+    f"{PACKAGE}.humidifier",
+    f"{PACKAGE}.sensor",
+    f"{PACKAGE}.services",
+    f"{PACKAGE}.profiler",
+    f"{PACKAGE}.transport",
+    "homeassistant.components.climate",
+    "cProfile",
+    "pstats",
+)
+
+# HA 启动时已经导入的模块 (集成加载前就在 sys.modules 中)
+PRELOADED = (
+    "homeassistant.core",
+    "homeassistant.config_entries",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.entity",
+    "homeassistant.helpers.event",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.dispatcher",
+)
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure(module):
+    """预先导入 HA 核心模块后导入 module, 返回 {模块名: 累计耗时 us}"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [
+            sys.executable, "-X", "importtime", "-c",
+            f"import {', '.join(PRELOADED)}; import {module}",
+        ],
+        cwd=root, capture_output=True, text=True, check=False,
+    )
+    if proc.returncode != 0:
+        sys.exit(proc.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            times[match.group(4)] = int(match.group(2))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=30.0,
+                        help="本集成模块累计导入耗时上限 (中位数)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    totals = []
+    eager = set()
+    for _ in range(args.runs):
+        times = measure(PACKAGE)
+        # 顶层包的累计耗时包含其导入的子模块, 以及 PRELOADED 之外的依赖
+        totals.append(times.get(PACKAGE, 0) / 1000)
+        eager.update(name for name in DEFERRED if name in times)
+
+    median = statistics.median(totals)
+    print(f"{PACKAGE}: median {median:.1f} ms over {args.runs} runs "
+          f"(min {min(totals):.1f}, max {max(totals):.1f})")
+
+    failed = False
+    if eager:
+        print("Modules imported eagerly:", ", ".join(sorted(eager)))
+        failed = True
+    if median > args.budget_ms:
+        print(f"Import time over budget ({args.budget_ms:.0f} ms)")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,38 @@
 import logging
-from homeassistant.config_entries import ConfigEntry
+from homeassistant.config_entries import ConfigEntry, ConfigEntryState
 from homeassistant.core import HomeAssistant
 
-from .const import DOMAIN, CONF_DEVICE_TYPE, DEVICE_TYPE_HUMIDIFIER, DEVICE_TYPE_AC
+from .const import DOMAIN, CONF_DEVICE_ID, CONF_DEVICE_TYPE, DEVICE_TYPE_HUMIDIFIER, DEVICE_TYPE_AC
+from .counters import RuntimeCounters
+from .delta import DeltaWriteSupport
+from .pending import PendingWrites
+from .watchdog import async_setup_watchdog
 
 _LOGGER = logging.getLogger(__name__)
 
 # 所有支持的平台
-ALL_PLATFORMS = ["climate", "humidifier"]
+ALL_PLATFORMS = ["climate", "humidifier", "sensor"]
 
 
 async def async_setup(hass: HomeAssistant, config: dict):
-    # 初始化全局数据存储，用于缓存 Session
-    hass.data.setdefault(DOMAIN, {
-        "session": None  # 结构: {'usrId': ..., 'ssid': ..., 'devices': ...}
-    })
+    # 初始化全局数据存储
+    # 按 usrId 隔离的账号上下文, 见 account.py
+    hass.data.setdefault(DOMAIN, {}).setdefault("accounts", {})
+    pending = hass.data[DOMAIN]["pending"] = PendingWrites(hass)
+    await pending.async_load()
+    counters = hass.data[DOMAIN]["counters"] = RuntimeCounters(hass)
+    await counters.async_load()
+    delta = hass.data[DOMAIN]["delta"] = DeltaWriteSupport(hass)
+    await delta.async_load()
+    # 服务 (含录制/剖析工具) 只在集成实际启用时加载
+    from .services import async_setup_services
+    async_setup_services(hass)
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     # 确保存储存在
-    hass.data.setdefault(DOMAIN, {"session": None})
+    hass.data.setdefault(DOMAIN, {}).setdefault("accounts", {})
     
     # 根据设备类型选择加载的平台
     device_type = entry.data.get(CONF_DEVICE_TYPE, DEVICE_TYPE_AC)
@@ -28,12 +40,24 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     if device_type == DEVICE_TYPE_HUMIDIFIER:
         platforms = ["humidifier"]
     else:
-        platforms = ["climate"]
+        platforms = ["climate", "sensor"]
     
+    # 看门狗全局共用一个定时器, 首个条目加载时启动, 最后一个条目卸载时停止
+    if "watchdog" not in hass.data[DOMAIN]:
+        hass.data[DOMAIN]["watchdog"] = async_setup_watchdog(hass)
+
     await hass.config_entries.async_forward_entry_setups(entry, platforms)
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
     return True
 
 
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry):
+    """选项修改后直接作用于运行中的实体, 不重载条目"""
+    entity = hass.data[DOMAIN].get("entities", {}).get(entry.data[CONF_DEVICE_ID])
+    if entity is not None:
+        entity.async_apply_options({**entry.data, **entry.options})
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     # 根据设备类型卸载对应平台
     device_type = entry.data.get(CONF_DEVICE_TYPE, DEVICE_TYPE_AC)
@@ -41,7 +65,15 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     if device_type == DEVICE_TYPE_HUMIDIFIER:
         platforms = ["humidifier"]
     else:
-        platforms = ["climate"]
+        platforms = ["climate", "sensor"]
     
     unload_ok = await hass.config_entries.async_unload_platforms(entry, platforms)
+    if unload_ok and not any(
+        other.state is ConfigEntryState.LOADED
+        for other in hass.config_entries.async_entries(DOMAIN)
+        if other.entry_id != entry.entry_id
+    ):
+        unsub = hass.data[DOMAIN].pop("watchdog", None)
+        if unsub is not None:
+            unsub()
     return unload_ok
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""账号隔离: 每个 usrId 独立的会话缓存、连接池、轮询调度与并发预算"""
+import asyncio
+import logging
+import time
+from collections import deque
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+
+from .const import DOMAIN, CONF_SSID
+from .scheduler import PollScheduler
+from .transport import async_post_json
+
+_LOGGER = logging.getLogger(__name__)
+
+# 单个账号同时进行的云端请求上限; 某个账号超时堆积时不会占用其他账号的额度
+ACCOUNT_MAX_CONCURRENCY = 8
+# 设备列表缓存有效期 (秒)
+DEVICE_LIST_TTL = 600
+# 会话在该时间 (秒) 内被证明有效 (拉取设备列表或实体轮询成功) 时, 无需再次校验
+SESSION_VALID_TTL = 300
+
+
+def async_get_account(hass: HomeAssistant, usr_id: str) -> "PanasonicAccount":
+    """获取 (或创建) 指定 usrId 的账号上下文"""
+    accounts = hass.data.setdefault(DOMAIN, {}).setdefault("accounts", {})
+    account = accounts.get(usr_id)
+    if account is None:
+        account = accounts[usr_id] = PanasonicAccount(hass, usr_id)
+    return account
+
+
+def async_get_accounts(hass: HomeAssistant) -> dict:
+    return hass.data.get(DOMAIN, {}).get("accounts", {})
+
+
+class PanasonicAccount:
+    """一个松下账号的运行时上下文"""
+
+    def __init__(self, hass: HomeAssistant, usr_id: str):
+        self.hass = hass
+        self.usr_id = usr_id
+        # 登录会话缓存, 结构: {'usrId', 'SSID', 'devices', 'familyId', 'realFamilyId'}
+        self.session_info = None
+        self._devices_fetched = None
+        self._session_validated = None
+        self.scheduler = PollScheduler(hass)
+        self._semaphore = asyncio.Semaphore(ACCOUNT_MAX_CONCURRENCY)
+        self._in_flight = 0
+        # 最近一分钟内的请求时间戳, 用于统计实际请求速率
+        self._request_times = deque(maxlen=10000)
+        self._http = None
+
+    @property
+    def http(self):
+        """账号独享的连接池, 懒创建 (HA 停止时自动关闭)"""
+        if self._http is None:
+            self._http = async_create_clientsession(self.hass)
+        return self._http
+
+    async def async_post(self, url, payload, headers, timeout=None) -> dict:
+        """在账号的并发额度内发起请求"""
+        self._request_times.append(time.monotonic())
+        async with self._semaphore:
+            self._in_flight += 1
+            try:
+                return await async_post_json(self.hass, self.http, url, payload, headers, timeout)
+            finally:
+                self._in_flight -= 1
+
+    @callback
+    def async_set_session(self, session_info: dict):
+        """登录成功后缓存会话 (含设备列表)"""
+        self.session_info = session_info
+        self._devices_fetched = self._session_validated = time.monotonic()
+
+    @callback
+    def async_update_devices(self, devices: dict):
+        if self.session_info is None:
+            return
+        self.session_info["devices"] = devices
+        self._devices_fetched = self._session_validated = time.monotonic()
+
+    @callback
+    def async_cached_devices(self):
+        """设备列表仍在有效期且会话近期被验证有效时返回缓存, 否则返回 None"""
+        if self.session_info is None or self._devices_fetched is None:
+            return None
+        now = time.monotonic()
+        if now - self._devices_fetched > DEVICE_LIST_TTL:
+            return None
+        if self._session_validated is None or now - self._session_validated > SESSION_VALID_TTL:
+            return None
+        return self.session_info.get("devices")
+
+    @callback
+    def async_mark_session_ok(self, ssid):
+        """实体用该 SSID 读取成功, 说明会话仍然有效 (免费的校验)"""
+        if self.session_info and self.session_info.get(CONF_SSID) == ssid:
+            self._session_validated = time.monotonic()
+
+    @callback
+    def async_mark_session_expired(self, ssid):
+        if self.session_info and self.session_info.get(CONF_SSID) == ssid:
+            _LOGGER.warning("Session of account %s expired", self.usr_id)
+            self.session_info = None
+            self._devices_fetched = self._session_validated = None
+
+    @property
+    def requests_per_minute(self) -> int:
+        """最近 60 秒内实际发出的请求数"""
+        cutoff = time.monotonic() - 60
+        while self._request_times and self._request_times[0] < cutoff:
+            self._request_times.popleft()
+        return len(self._request_times)
+
+    def as_dict(self) -> dict:
+        """诊断信息"""
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "has_session": self.session_info is not None,
+            "in_flight": self._in_flight,
+            "polling": self.scheduler.as_dict(),
+        }
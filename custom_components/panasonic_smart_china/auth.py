@@ -0,0 +1,53 @@
+"""登录与设备 token 的哈希算法 (仅在配置流程中使用)"""
+import hashlib
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# 支持的设备ID分隔符列表
+TOKEN_SEPARATORS = ['_0900_', '_0840_', '_0A00_', '_0B00_', '_0C00_']
+
+
+def login_password_hash(username: str, password: str, token_start: str) -> str:
+    """登录密码: MD5(MD5(MD5(密码) + 账号) + 服务端 token)"""
+    pwd_md5 = hashlib.md5(password.encode()).hexdigest().upper()
+    inter_md5 = hashlib.md5((pwd_md5 + username).encode()).hexdigest().upper()
+    return hashlib.md5((inter_md5 + token_start).encode()).hexdigest().upper()
+
+
+def generate_device_token(device_id: str) -> str:
+    """生成设备token, 支持空调和加湿器
+
+    设备ID格式: XXXXXXXXXXXX_YYYY_ZZZZZZ
+    - 空调: _0900_
+    - 加湿器: _0840_
+
+    Token算法: SHA512(SHA512(后6位+分隔符+前6位) + '_' + 设备后缀)
+    """
+    for sep in TOKEN_SEPARATORS:
+        sep_upper = sep
+        sep_lower = sep.lower()
+
+        # 查找分隔符 (不区分大小写)
+        if sep_upper in device_id.upper():
+            # 找到实际分隔符位置
+            idx = device_id.upper().find(sep_upper)
+            prefix = device_id[:idx].upper()  # prefix转大写
+            suffix = device_id[idx + len(sep):]  # suffix保持原样
+
+            _LOGGER.debug("Token生成: prefix=%s, sep=%s, suffix=%s", prefix, sep, suffix)
+
+            # Token算法: 后6位 + 分隔符 + 前6位
+            if len(prefix) >= 12:
+                stoken = prefix[6:12] + sep_upper + prefix[:6]
+            else:
+                stoken = prefix[len(prefix)//2:] + sep_upper + prefix[:len(prefix)//2]
+
+            inner = hashlib.sha512(stoken.encode()).hexdigest()
+            token = hashlib.sha512((inner + '_' + suffix).encode()).hexdigest()
+
+            _LOGGER.debug("Token生成: stoken=%s", stoken)
+            return token
+
+    # 无法识别格式，使用简单hash
+    return hashlib.sha512(device_id.encode()).hexdigest()
@@ -1,5 +1,4 @@
 import logging
-import async_timeout
 from datetime import timedelta
 
 from homeassistant.components.climate import ClimateEntity
@@ -14,15 +13,15 @@ from homeassistant.const import (
     STATE_UNKNOWN,
     UnitOfTemperature,
 )
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.event import async_track_time_interval
 
 from .const import (
-    CONF_USR_ID, CONF_DEVICE_ID, CONF_TOKEN, CONF_SSID, 
-    CONF_SENSOR_ID, CONF_CONTROLLER_MODEL, CONF_DEVICE_TYPE,
-    SUPPORTED_CONTROLLERS, FAN_MUTE, FAN_MIN, FAN_MAX,
-    DEVICE_TYPE_AC, DEVICE_TYPE_HUMIDIFIER
+    CONF_SENSOR_ID, CONF_CONTROLLER_MODEL, DEFAULT_CONTROLLER_MODEL, CONF_DEVICE_TYPE,
+    FAN_MUTE, FAN_MIN, FAN_MAX,
+    DEVICE_TYPE_AC, DEVICE_TYPE_HUMIDIFIER, DEFAULT_POLL_INTERVAL_AC, MIN_TEMP, MAX_TEMP,
 )
+from .controllers import SUPPORTED_CONTROLLERS
+from .counters import async_get_counters
+from .entity import PanasonicBaseEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -30,11 +29,22 @@ URL_SET = "https://app.psmartcloud.com/App/ACDevSetStatusInfoAW"
 URL_GET = "https://app.psmartcloud.com/App/ACDevGetStatusInfoAW"
 
 # === 轮询频率 ===
-POLLING_INTERVAL = timedelta(seconds=15)
+POLLING_INTERVAL = timedelta(seconds=DEFAULT_POLL_INTERVAL_AC)
+
+# 写入时允许回传的字段
+SAFE_KEYS = [
+    "runMode", "forceRunning", "runStatus", "remoteForbidMode", "remoteMode",
+    "setTemperature", "setHumidity", "windSet", "exchangeWindSet", 
+    "portraitWindSet", "orientationWindSet", "nanoeG", "nanoe", "ecoMode", 
+    "muteMode", "filterReset", "powerful", "powerfulMode", "thermoMode", "buzzer", 
+    "autoRunMode", "unusualPresent", "runForbidden", "inhaleTemperature", 
+    "outsideTemperature", "insideHumidity", "alarmCode", "nanoeModule", "TDWindModule"
+]
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """Setup climate entity."""
-    config = entry.data
+    # 选项覆盖配置数据
+    config = {**entry.data, **entry.options}
     
     # 仅为空调类型设备创建实体 (跳过加湿器)
     device_type = config.get(CONF_DEVICE_TYPE, DEVICE_TYPE_AC)
@@ -43,23 +53,27 @@ async def async_setup_entry(hass, entry, async_add_entities):
     
     async_add_entities([PanasonicACEntity(hass, config, entry.title)])
 
-class PanasonicACEntity(ClimateEntity):
+class PanasonicACEntity(PanasonicBaseEntity, ClimateEntity):
+    _polling_interval = POLLING_INTERVAL
+    _safe_keys = SAFE_KEYS
+    _delta_check_keys = ("runStatus", "runMode", "setTemperature", "windSet", "muteMode")
+    _history_fields = (
+        "runStatus", "runMode", "setTemperature", "windSet",
+        "inhaleTemperature", "outsideTemperature", "insideHumidity",
+    )
+
     def __init__(self, hass, config, name):
-        self._hass = hass
-        self._usr_id = config[CONF_USR_ID]
-        self._device_id = config[CONF_DEVICE_ID]
-        self._token = config[CONF_TOKEN]
-        self._ssid = config[CONF_SSID]
+        super().__init__(hass, config, name)
         self._sensor_id = config[CONF_SENSOR_ID]
-        self._attr_name = name
-        self._attr_unique_id = f"panasonic_{self._device_id}"
+        self._counters = async_get_counters(hass)
 
         # === 加载控制器配置 ===
-        model = config.get(CONF_CONTROLLER_MODEL, "CZ-RD501DW2")
+        model = config.get(CONF_CONTROLLER_MODEL, DEFAULT_CONTROLLER_MODEL)
         self._profile = SUPPORTED_CONTROLLERS.get(model)
         if not self._profile:
             _LOGGER.error(f"Controller model {model} not found, using default.")
-            self._profile = list(SUPPORTED_CONTROLLERS.values())[0]
+            model, self._profile = next(iter(SUPPORTED_CONTROLLERS.items()))
+        self._model = model
 
         # 提取配置到本地变量
         self._temp_scale = self._profile.get("temp_scale", 2)
@@ -72,36 +86,6 @@ class PanasonicACEntity(ClimateEntity):
         self._hvac_mode = HVACMode.OFF
         self._target_temperature = 26.0
         self._fan_mode = FAN_AUTO
-        self._last_params = {} 
-        
-        # 定时器句柄
-        self._unsub_polling = None
-
-    @property
-    def should_poll(self):
-        """关闭 HA 默认慢速轮询"""
-        return False
-
-    async def async_added_to_hass(self):
-        """实体添加时启动定时轮询"""
-        await super().async_added_to_hass()
-        self._unsub_polling = async_track_time_interval(
-            self._hass, 
-            self._async_update_interval_wrapper, 
-            POLLING_INTERVAL
-        )
-
-    async def async_will_remove_from_hass(self):
-        """实体移除时销毁定时器"""
-        if self._unsub_polling:
-            self._unsub_polling()
-            self._unsub_polling = None
-        await super().async_will_remove_from_hass()
-
-    async def _async_update_interval_wrapper(self, now):
-        """定时器回调"""
-        await self.async_update()
-        self.async_write_ha_state()
 
     @property
     def supported_features(self):
@@ -118,11 +102,11 @@ class PanasonicACEntity(ClimateEntity):
 
     @property
     def min_temp(self):
-        return 16.0
+        return float(MIN_TEMP)
 
     @property
     def max_temp(self):
-        return 30.0
+        return float(MAX_TEMP)
 
     @property
     def target_temperature_step(self):
@@ -164,38 +148,45 @@ class PanasonicACEntity(ClimateEntity):
     def target_temperature(self):
         return self._target_temperature
 
-    async def async_update(self):
-        """轮询更新"""
-        await self._fetch_status(update_internal_state=True)
-
-    async def _fetch_status(self, update_internal_state=True):
-        """通用方法：获取设备当前最新状态"""
+    async def _async_request_status(self):
+        """向云端请求设备当前最新状态"""
         headers = self._get_headers()
         payload = {"id": 100, "usrId": self._usr_id, "deviceId": self._device_id, "token": self._token}
         
         try:
-            session = async_get_clientsession(self._hass)
-            async with async_timeout.timeout(5):
-                response = await session.post(URL_GET, json=payload, headers=headers, ssl=False)
-                json_data = await response.json()
-                
-                if json_data.get('errorCode') in ['3003', '3004']:
-                     _LOGGER.error("SSID expired.")
-                     return None
-
-                if 'results' in json_data and 'runStatus' in json_data['results']:
-                    res = json_data['results']
-                    self._last_params = res 
-                    
-                    if update_internal_state:
-                        self._update_local_state(res)
-                    
-                    return res
+            json_data = await self._async_read(URL_GET, payload, headers)
+            
+            if json_data.get('errorCode') in ['3003', '3004']:
+                 _LOGGER.error("SSID expired.")
+                 self._account.async_mark_session_expired(self._ssid)
+                 return None
+
+            if 'results' in json_data and 'runStatus' in json_data['results']:
+                res = json_data['results']
+                self._last_params = res 
+                return res
         except Exception as e:
             _LOGGER.debug("Fetch status failed: %s", e)
             return None
         return None
 
+    def _on_status(self, res):
+        """累加运行时长计数器"""
+        self._counters.async_observe(
+            self._device_id, res, 3 * self._polling_interval.total_seconds()
+        )
+
+    def _history_values(self, res):
+        """设定温度按线控器倍率换算为摄氏度"""
+        values = super()._history_values(res)
+        i = self._history_fields.index("setTemperature")
+        if values[i] is not None:
+            try:
+                values[i] = values[i] / self._temp_scale
+            except TypeError:
+                values[i] = None
+        return values
+
     def _update_local_state(self, res):
         """更新 HA 实体状态"""
         self._is_on = (res.get('runStatus') == 1)
@@ -224,12 +215,51 @@ class PanasonicACEntity(ClimateEntity):
             if not found_normal:
                 self._fan_mode = FAN_AUTO
 
-    async def async_set_hvac_mode(self, hvac_mode):
+    @property
+    def _write_profile(self):
+        return f"ac:{self._model}"
+
+    def _hvac_mode_changes(self, hvac_mode):
+        """未知模式抛出 ValueError, 不回退到默认模式"""
         if hvac_mode == HVACMode.OFF:
-            await self._send_command({"runStatus": 0})
-        else:
-            p_mode = self._hvac_map.get(hvac_mode, 3)
-            await self._send_command({"runStatus": 1, "runMode": p_mode})
+            return {"runStatus": 0}
+        if hvac_mode not in self._hvac_map:
+            raise ValueError(f"Unsupported hvac_mode: {hvac_mode}")
+        return {"runStatus": 1, "runMode": self._hvac_map[hvac_mode]}
+
+    def _fan_mode_changes(self, fan_mode):
+        """未知风速抛出 ValueError, 不回退到默认风速"""
+        if fan_mode == FAN_MUTE:
+            return {"windSet": 10, "muteMode": 1}
+        if fan_mode not in self._fan_map:
+            raise ValueError(f"Unsupported fan_mode: {fan_mode}")
+        return {"windSet": self._fan_map[fan_mode], "muteMode": 0}
+
+    @staticmethod
+    def _match_mode(value, modes):
+        """批量服务传入的模式名不区分大小写 ("Off" -> "off")"""
+        for mode in modes:
+            if mode.lower() == value.lower():
+                return mode
+        return value
+
+    def _build_changes(self, change_set):
+        """将批量服务的变更集转换为云端参数, 未知模式或风速抛出 ValueError"""
+        changes = {}
+        if "power" in change_set:
+            changes["runStatus"] = 1 if change_set["power"] else 0
+        if "hvac_mode" in change_set:
+            hvac_mode = self._match_mode(change_set["hvac_mode"], self.hvac_modes)
+            changes.update(self._hvac_mode_changes(hvac_mode))
+        if "temperature" in change_set:
+            changes["setTemperature"] = int(change_set["temperature"] * self._temp_scale)
+        if "fan_mode" in change_set:
+            fan_mode = self._match_mode(change_set["fan_mode"], self.fan_modes)
+            changes.update(self._fan_mode_changes(fan_mode))
+        return changes
+
+    async def async_set_hvac_mode(self, hvac_mode):
+        await self._send_command(self._hvac_mode_changes(hvac_mode))
 
     async def async_set_temperature(self, **kwargs):
         temp = kwargs.get(ATTR_TEMPERATURE)
@@ -237,13 +267,7 @@ class PanasonicACEntity(ClimateEntity):
         await self._send_command({"setTemperature": int(temp * self._temp_scale)})
 
     async def async_set_fan_mode(self, fan_mode):
-        changes = {}
-        if fan_mode == FAN_MUTE:
-            changes = {"windSet": 10, "muteMode": 1}
-        else:
-            val = self._fan_map.get(fan_mode, 10)
-            changes = {"windSet": val, "muteMode": 0}
-        await self._send_command(changes)
+        await self._send_command(self._fan_mode_changes(fan_mode))
 
     async def async_turn_on(self):
         await self._send_command({"runStatus": 1})
@@ -251,56 +275,10 @@ class PanasonicACEntity(ClimateEntity):
     async def async_turn_off(self):
         await self._send_command({"runStatus": 0})
 
-    async def _send_command(self, changes):
-        """Read-Modify-Write 核心逻辑"""
-        
-        # 1. Read
-        latest_params = await self._fetch_status(update_internal_state=False)
-        
-        if latest_params:
-            current_params = latest_params.copy()
-        else:
-            _LOGGER.warning("Could not fetch latest status, using cached params.")
-            current_params = self._last_params.copy()
-
-        # 2. Modify
-        current_params.update(changes)
-        
-        # 3. Filter
-        safe_keys = [
-            "runMode", "forceRunning", "runStatus", "remoteForbidMode", "remoteMode",
-            "setTemperature", "setHumidity", "windSet", "exchangeWindSet", 
-            "portraitWindSet", "orientationWindSet", "nanoeG", "nanoe", "ecoMode", 
-            "muteMode", "filterReset", "powerful", "powerfulMode", "thermoMode", "buzzer", 
-            "autoRunMode", "unusualPresent", "runForbidden", "inhaleTemperature", 
-            "outsideTemperature", "insideHumidity", "alarmCode", "nanoeModule", "TDWindModule"
-        ]
-        params = {k: v for k, v in current_params.items() if k in safe_keys}
-
-        # 4. Write
+    async def _async_write_params(self, params):
+        """写入过滤后的完整参数"""
         headers = self._get_headers()
-        try:
-            session = async_get_clientsession(self._hass)
-            async with async_timeout.timeout(10):
-                await session.post(URL_SET, json={
-                    "id": 200, "usrId": self._usr_id, "deviceId": self._device_id, 
-                    "token": self._token, "params": params
-                }, headers=headers, ssl=False)
-                
-                # 5. 更新本地状态 (关键)
-                self._update_local_state(current_params)
-                self._last_params = current_params
-                
-                # 6. 【修复点】强制通知 HA 刷新界面 (乐观更新)
-                self.async_write_ha_state()
-
-        except Exception as e:
-            _LOGGER.error("Set failed: %s", e)
-
-    def _get_headers(self):
-        return {
-            'Content-Type': 'application/json',
-            'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 18_5 like Mac OS X)',
-            'xtoken': f'SSID={self._ssid}',
-            'DNT': '1', 'Origin': 'https://app.psmartcloud.com', 'X-Requested-With': 'XMLHttpRequest'
-        }
\ No newline at end of file
+        return await self._account.async_post(URL_SET, {
+            "id": 200, "usrId": self._usr_id, "deviceId": self._device_id, 
+            "token": self._token, "params": params
+        }, headers, timeout=self._request_timeout * 2)
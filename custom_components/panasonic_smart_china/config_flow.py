@@ -1,17 +1,21 @@
 import logging
-import hashlib
 import voluptuous as vol
-import aiohttp
 
 from homeassistant import config_entries
-from homeassistant.helpers.selector import EntitySelector, EntitySelectorConfig
+from homeassistant.core import callback
+import homeassistant.helpers.config_validation as cv
 from homeassistant.const import CONF_USERNAME, CONF_PASSWORD
 
 from .const import (
     DOMAIN, CONF_USR_ID, CONF_DEVICE_ID, CONF_TOKEN, 
     CONF_SSID, CONF_SENSOR_ID, CONF_CONTROLLER_MODEL, CONF_DEVICE_TYPE,
-    SUPPORTED_CONTROLLERS, DEVICE_TYPE_AC, DEVICE_TYPE_HUMIDIFIER
+    DEFAULT_CONTROLLER_MODEL, DEVICE_TYPE_AC, DEVICE_TYPE_HUMIDIFIER,
+    CONF_POLL_INTERVAL, CONF_REQUEST_TIMEOUT, CONF_COMMAND_DEBOUNCE, CONF_CONFIRM_WRITES, CONF_HEDGE_READS,
+    DEFAULT_POLL_INTERVAL_AC, DEFAULT_POLL_INTERVAL_HUMIDIFIER,
+    DEFAULT_REQUEST_TIMEOUT, DEFAULT_COMMAND_DEBOUNCE,
 )
+from .account import async_get_account, async_get_accounts
+from .transport import async_post_json
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -19,44 +23,41 @@ URL_LOGIN = "https://app.psmartcloud.com/App/UsrLogin"
 URL_GET_DEV = "https://app.psmartcloud.com/App/UsrGetBindDevInfo"
 URL_GET_TOKEN = "https://app.psmartcloud.com/App/UsrGetToken"
 
+CONF_ACCOUNT = "account"
+CONF_DEVICES = "devices"
+CONF_REFRESH = "refresh"
+ACCOUNT_NEW = "__new__"
+
+
+def _controller_options():
+    """线控器选项 (延迟导入, 避免加湿器用户加载空调常量)"""
+    from .controllers import SUPPORTED_CONTROLLERS
+    return {k: v["name"] for k, v in SUPPORTED_CONTROLLERS.items()}
+
+
 class PanasonicConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        return PanasonicOptionsFlow(config_entry)
+
     def __init__(self):
         self._login_data = {}
         self._devices = {}
         self._temp_login_info = {}
+        self._force_login = False
 
     async def async_step_user(self, user_input=None):
-        """步骤1: 检查缓存 Session 或 登录"""
+        """步骤1: 选择已缓存的账号 或 登录"""
         errors = {}
 
-        # 1. 检查全局缓存中是否有现成的 Session
-        # 修复点：使用 .get() 安全访问，防止 KeyError
-        domain_data = self.hass.data.get(DOMAIN, {})
-        cached_session = domain_data.get("session")
-
-        if cached_session:
-            _LOGGER.info("Found cached session, verifying validity...")
-            
-            # 验证 Session 是否有效
-            valid_devices = await self._get_devices_with_ssid(
-                cached_session[CONF_USR_ID], cached_session[CONF_SSID]
-            )
-            
-            if valid_devices:
-                _LOGGER.info("Session valid. Skipping login.")
-                self._login_data = {
-                    CONF_USR_ID: cached_session[CONF_USR_ID],
-                    CONF_SSID: cached_session[CONF_SSID]
-                }
-                self._devices = valid_devices
-                return await self.async_step_device()
-            else:
-                _LOGGER.warning("Cached session expired.")
-                # 清除无效 Session (如果存在)
-                if DOMAIN in self.hass.data:
-                    self.hass.data[DOMAIN]["session"] = None
+        # 1. 已有缓存会话的账号: 先让用户选择复用哪个账号
+        if user_input is None and not self._force_login:
+            cached = [a for a in async_get_accounts(self.hass).values() if a.session_info]
+            if cached:
+                return await self.async_step_account()
 
         # 2. 处理用户登录输入
         if user_input is not None:
@@ -72,19 +73,16 @@ class PanasonicConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 self._login_data = {CONF_USR_ID: usr_id, CONF_SSID: ssid}
                 self._devices = devices
                 
-                # *** 关键修复：确保 DOMAIN 字典存在 ***
-                self.hass.data.setdefault(DOMAIN, {})
-                
-                # 更新全局缓存
-                self.hass.data[DOMAIN]["session"] = {
+                # 更新该账号的会话缓存 (不影响其他账号)
+                async_get_account(self.hass, usr_id).async_set_session({
                     CONF_USR_ID: usr_id,
                     CONF_SSID: ssid,
                     "devices": devices,
                     "familyId": self._temp_login_info.get('familyId'),
                     "realFamilyId": self._temp_login_info.get('realFamilyId')
-                }
+                })
 
-                return await self.async_step_device()
+                return await self.async_step_choose()
 
             except Exception as e:
                 _LOGGER.error("Login failed: %s", e)
@@ -99,6 +97,53 @@ class PanasonicConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors=errors,
         )
 
+    async def async_step_account(self, user_input=None):
+        """步骤1b: 复用已登录账号的会话, 或登录新账号"""
+        accounts = {
+            usr_id: account
+            for usr_id, account in async_get_accounts(self.hass).items()
+            if account.session_info
+        }
+
+        if user_input is not None:
+            usr_id = user_input[CONF_ACCOUNT]
+            account = accounts.get(usr_id)
+            if account is not None:
+                # 设备列表在有效期内且会话近期验证过时直接复用, 无需访问云端
+                valid_devices = None
+                if not user_input.get(CONF_REFRESH):
+                    valid_devices = account.async_cached_devices()
+                if not valid_devices:
+                    _LOGGER.info("Found cached session, verifying validity...")
+                    valid_devices = await self._get_devices_with_ssid(account)
+                    if valid_devices:
+                        account.async_update_devices(valid_devices)
+                if valid_devices:
+                    _LOGGER.info("Session valid. Skipping login.")
+                    self._login_data = {
+                        CONF_USR_ID: account.session_info[CONF_USR_ID],
+                        CONF_SSID: account.session_info[CONF_SSID]
+                    }
+                    self._devices = valid_devices
+                    return await self.async_step_choose()
+
+                _LOGGER.warning("Cached session expired.")
+                # 仅清除该账号的无效 Session
+                account.async_mark_session_expired(account.session_info[CONF_SSID])
+
+            self._force_login = True
+            return await self.async_step_user()
+
+        options = {usr_id: usr_id for usr_id in accounts}
+        options[ACCOUNT_NEW] = "+ 登录其他账号 (Log in another account)"
+        return self.async_show_form(
+            step_id="account",
+            data_schema=vol.Schema({
+                vol.Required(CONF_ACCOUNT, default=next(iter(options))): vol.In(options),
+                vol.Optional(CONF_REFRESH, default=False): bool,
+            }),
+        )
+
     def _detect_device_type(self, device_id: str, device_info: dict) -> str:
         """检测设备类型：空调或加湿器
         
@@ -131,23 +176,113 @@ class PanasonicConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         # 默认认为是空调
         return DEVICE_TYPE_AC
 
-    async def async_step_device(self, user_input=None):
-        """步骤2: 选择设备"""
-        errors = {}
-        
+    def _available_devices(self):
+        """返回未添加的设备 ({did: 显示名}, {did: 检测到的类型})"""
         # 获取已添加的设备，防止重复
-        existing_ids = self._async_current_ids()
+        # 注意：这里的 unique_id 必须与 climate.py/humidifier.py 中保持一致
+        existing_ids = set(self._async_current_ids())
+        existing_ids.update(
+            f"panasonic_{entry.data.get(CONF_DEVICE_ID)}" for entry in self._async_current_entries()
+        )
         
         # 构建可选设备列表 (排除已存在的)，并检测设备类型
         available_devices = {}
         device_types = {}
         for did, info in self._devices.items():
-            # 注意：这里的 unique_id 必须与 climate.py/humidifier.py 中保持一致
             if f"panasonic_{did}" not in existing_ids:
                 detected_type = self._detect_device_type(did, info)
                 type_label = "加湿器" if detected_type == DEVICE_TYPE_HUMIDIFIER else "空调"
                 available_devices[did] = f"{info['deviceName']} [{type_label}] ({did})"
                 device_types[did] = detected_type
+        return available_devices, device_types
+
+    def _build_entry_data(self, device_id, device_type, token, sensor_id="", controller_model=DEFAULT_CONTROLLER_MODEL):
+        """根据设备类型构建配置数据"""
+        data = {
+            CONF_USR_ID: self._login_data[CONF_USR_ID],
+            CONF_SSID: self._login_data[CONF_SSID],
+            CONF_DEVICE_ID: device_id,
+            CONF_TOKEN: token,
+            CONF_DEVICE_TYPE: device_type,
+        }
+        
+        if device_type == DEVICE_TYPE_AC:
+            # 空调需要额外配置
+            data[CONF_SENSOR_ID] = sensor_id
+            data[CONF_CONTROLLER_MODEL] = controller_model
+        return data
+
+    async def async_step_choose(self, user_input=None):
+        """步骤2: 逐个添加 或 批量添加全部设备"""
+        available_devices, _ = self._available_devices()
+        if len(available_devices) <= 1:
+            return await self.async_step_device()
+        return self.async_show_menu(step_id="choose", menu_options=["device", "bulk"])
+
+    async def async_step_bulk(self, user_input=None):
+        """步骤2b: 一次性添加所有未配置的设备 (使用自动检测的类型与默认线控器)"""
+        available_devices, device_types = self._available_devices()
+        if not available_devices:
+            return self.async_abort(reason="all_devices_configured")
+
+        if user_input is not None:
+            selected = [did for did in user_input[CONF_DEVICES] if did in available_devices]
+            if not selected:
+                return self.async_abort(reason="no_devices_found")
+
+            controller_model = user_input.get(CONF_CONTROLLER_MODEL, DEFAULT_CONTROLLER_MODEL)
+            entries = []
+            for did in selected:
+                token = self._generate_token(did, device_types[did])
+                if not token:
+                    _LOGGER.error("Token generation failed for %s, skipped", did)
+                    continue
+                title = self._devices[did].get("deviceName", "Panasonic Device")
+                data = self._build_entry_data(
+                    did, device_types[did], token, controller_model=controller_model
+                )
+                entries.append((did, title, data))
+
+            if not entries:
+                return self.async_abort(reason="token_generation_failed")
+
+            # 其余设备通过 import 流程各自创建条目, 当前流程创建第一个
+            for did, title, data in entries[1:]:
+                self.hass.async_create_task(
+                    self.hass.config_entries.flow.async_init(
+                        DOMAIN,
+                        context={"source": config_entries.SOURCE_IMPORT},
+                        data={"title": title, "data": data},
+                    )
+                )
+
+            did, title, data = entries[0]
+            await self.async_set_unique_id(f"panasonic_{did}")
+            self._abort_if_unique_id_configured()
+            return self.async_create_entry(title=title, data=data)
+
+        controller_options = _controller_options()
+        return self.async_show_form(
+            step_id="bulk",
+            data_schema=vol.Schema({
+                vol.Required(CONF_DEVICES, default=list(available_devices)): cv.multi_select(available_devices),
+                vol.Optional(CONF_CONTROLLER_MODEL, default=DEFAULT_CONTROLLER_MODEL): vol.In(controller_options),
+            }),
+            description_placeholders={"count": str(len(available_devices))},
+        )
+
+    async def async_step_import(self, import_data):
+        """为批量添加中的单个设备创建条目"""
+        data = import_data["data"]
+        await self.async_set_unique_id(f"panasonic_{data[CONF_DEVICE_ID]}")
+        self._abort_if_unique_id_configured()
+        return self.async_create_entry(title=import_data["title"], data=data)
+
+    async def async_step_device(self, user_input=None):
+        """步骤2: 选择设备"""
+        errors = {}
+        
+        available_devices, device_types = self._available_devices()
 
         if not available_devices:
             return self.async_abort(reason="all_devices_configured")
@@ -164,24 +299,19 @@ class PanasonicConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             if not token:
                 errors["base"] = "token_generation_failed"
             else:
-                # 根据设备类型构建配置数据
-                data = {
-                    CONF_USR_ID: self._login_data[CONF_USR_ID],
-                    CONF_SSID: self._login_data[CONF_SSID],
-                    CONF_DEVICE_ID: selected_dev_id,
-                    CONF_TOKEN: token,
-                    CONF_DEVICE_TYPE: selected_type,
-                }
-                
-                if selected_type == DEVICE_TYPE_AC:
-                    # 空调需要额外配置
-                    data[CONF_SENSOR_ID] = user_input.get(CONF_SENSOR_ID, "")
-                    data[CONF_CONTROLLER_MODEL] = user_input.get(CONF_CONTROLLER_MODEL, "CZ-RD501DW2")
+                data = self._build_entry_data(
+                    selected_dev_id, selected_type, token,
+                    sensor_id=user_input.get(CONF_SENSOR_ID, ""),
+                    controller_model=user_input.get(CONF_CONTROLLER_MODEL, DEFAULT_CONTROLLER_MODEL),
+                )
                 
+                await self.async_set_unique_id(f"panasonic_{selected_dev_id}")
+                self._abort_if_unique_id_configured()
                 return self.async_create_entry(title=dev_name, data=data)
 
-        # 构建控制器列表
-        controller_options = {k: v["name"] for k, v in SUPPORTED_CONTROLLERS.items()}
+        # 构建控制器列表 (空调相关模块与实体选择器仅在此时加载)
+        from homeassistant.helpers.selector import EntitySelector, EntitySelectorConfig
+        controller_options = _controller_options()
         
         # 设备类型选项
         device_type_options = {
@@ -194,7 +324,7 @@ class PanasonicConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             data_schema=vol.Schema({
                 vol.Required(CONF_DEVICE_ID): vol.In(available_devices),
                 vol.Required(CONF_DEVICE_TYPE, default=DEVICE_TYPE_AC): vol.In(device_type_options),
-                vol.Optional(CONF_CONTROLLER_MODEL, default="CZ-RD501DW2"): vol.In(controller_options),
+                vol.Optional(CONF_CONTROLLER_MODEL, default=DEFAULT_CONTROLLER_MODEL): vol.In(controller_options),
                 vol.Optional(CONF_SENSOR_ID): EntitySelector(
                     EntitySelectorConfig(domain="sensor")
                 ),
@@ -202,85 +332,79 @@ class PanasonicConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors=errors,
         )
 
-    async def _get_devices_with_ssid(self, usr_id, ssid):
+    async def _get_devices_with_ssid(self, account):
         """仅使用 SSID 尝试获取设备列表 (用于验证 Session)"""
-        headers = {'User-Agent': 'SmartApp', 'Content-Type': 'application/json', 'Cookie': f"SSID={ssid}"}
-        
-        # 安全读取缓存
-        domain_data = self.hass.data.get(DOMAIN, {})
-        session_cache = domain_data.get("session")
-        
+        session_cache = account.session_info
         if not session_cache or 'familyId' not in session_cache:
             return None
 
+        ssid = session_cache[CONF_SSID]
+        headers = {'User-Agent': 'SmartApp', 'Content-Type': 'application/json', 'Cookie': f"SSID={ssid}"}
+
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(URL_GET_DEV, json={
-                    "id": 3, "uiVersion": 4.0,
-                    "params": {
-                        "realFamilyId": session_cache['realFamilyId'], 
-                        "familyId": session_cache['familyId'], 
-                        "usrId": usr_id
-                    }
-                }, headers=headers, ssl=False) as resp:
-                    if resp.status != 200: return None
-                    dev_res = await resp.json()
-                    if 'results' not in dev_res: return None
-                    
-                    devices = {}
-                    for dev in dev_res['results']['devList']:
-                        devices[dev['deviceId']] = dev['params']
-                    return devices
-        except:
+            dev_res = await account.async_post(URL_GET_DEV, {
+                "id": 3, "uiVersion": 4.0,
+                "params": {
+                    "realFamilyId": session_cache['realFamilyId'], 
+                    "familyId": session_cache['familyId'], 
+                    "usrId": account.usr_id
+                }
+            }, headers)
+            if 'results' not in dev_res: return None
+            
+            devices = {}
+            for dev in dev_res['results']['devList']:
+                devices[dev['deviceId']] = dev['params']
+            return devices
+        except Exception:
             return None
 
     async def _authenticate_full_flow(self, username, password):
         """完整的登录流程"""
+        # 登录相关依赖只在用户实际登录时加载
+        import aiohttp
+        from .auth import login_password_hash
+
         headers = {'User-Agent': 'SmartApp', 'Content-Type': 'application/json'}
         async with aiohttp.ClientSession() as session:
             # 1. GetToken
-            async with session.post(URL_GET_TOKEN, json={
+            data = await async_post_json(self.hass, session, URL_GET_TOKEN, {
                 "id": 1, "uiVersion": 4.0, "params": {"usrId": username}
-            }, headers=headers, ssl=False) as resp:
-                data = await resp.json()
-                if 'results' not in data: raise Exception("GetToken Failed")
-                token_start = data['results']['token']
+            }, headers)
+            if 'results' not in data: raise Exception("GetToken Failed")
+            token_start = data['results']['token']
             
             # 2. Calc Password
-            pwd_md5 = hashlib.md5(password.encode()).hexdigest().upper()
-            inter_md5 = hashlib.md5((pwd_md5 + username).encode()).hexdigest().upper()
-            final_token = hashlib.md5((inter_md5 + token_start).encode()).hexdigest().upper()
+            final_token = login_password_hash(username, password, token_start)
             
             # 3. Login
-            async with session.post(URL_LOGIN, json={
+            login_res = await async_post_json(self.hass, session, URL_LOGIN, {
                 "id": 2, "uiVersion": 4.0, 
                 "params": {"telId": "00:00:00:00:00:00", "checkFailCount": 0, "usrId": username, "pwd": final_token}
-            }, headers=headers, ssl=False) as resp:
-                login_res = await resp.json()
-                if "results" not in login_res: raise Exception("Login Failed")
-                
-                res = login_res['results']
-                real_usr_id = res['usrId']
-                ssid = res['ssId']
-                
-                # 临时保存 family 数据
-                self._temp_login_info = {
-                    'realFamilyId': res['realFamilyId'],
-                    'familyId': res['familyId']
-                }
+            }, headers)
+            if "results" not in login_res: raise Exception("Login Failed")
+            
+            res = login_res['results']
+            real_usr_id = res['usrId']
+            ssid = res['ssId']
+            
+            # 临时保存 family 数据
+            self._temp_login_info = {
+                'realFamilyId': res['realFamilyId'],
+                'familyId': res['familyId']
+            }
 
             # 4. Get Devices
             headers['Cookie'] = f"SSID={ssid}"
-            async with session.post(URL_GET_DEV, json={
+            dev_res = await async_post_json(self.hass, session, URL_GET_DEV, {
                 "id": 3, "uiVersion": 4.0,
                 "params": {"realFamilyId": res['realFamilyId'], "familyId": res['familyId'], "usrId": real_usr_id}
-            }, headers=headers, ssl=False) as resp:
-                dev_res = await resp.json()
-                devices = {}
-                if 'results' in dev_res and 'devList' in dev_res['results']:
-                    for dev in dev_res['results']['devList']:
-                        devices[dev['deviceId']] = dev['params']
-                return real_usr_id, ssid, devices
+            }, headers)
+            devices = {}
+            if 'results' in dev_res and 'devList' in dev_res['results']:
+                for dev in dev_res['results']['devList']:
+                    devices[dev['deviceId']] = dev['params']
+            return real_usr_id, ssid, devices
 
     def _generate_token(self, device_id: str, device_type: str = DEVICE_TYPE_AC) -> str | None:
         """生成设备token, 支持空调和加湿器
@@ -291,38 +415,56 @@ class PanasonicConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         
         Token算法: SHA512(SHA512(后6位+分隔符+前6位) + '_' + 设备后缀)
         """
+        # 哈希算法只在添加设备时用到, 延迟导入
+        from .auth import generate_device_token
+
         try:
-            # 支持的分隔符列表
-            separators = ['_0900_', '_0840_', '_0A00_', '_0B00_', '_0C00_']
-            
-            for sep in separators:
-                sep_upper = sep
-                sep_lower = sep.lower()
-                
-                # 查找分隔符 (不区分大小写)
-                if sep_upper in device_id.upper():
-                    # 找到实际分隔符位置
-                    idx = device_id.upper().find(sep_upper)
-                    prefix = device_id[:idx].upper()  # prefix转大写
-                    suffix = device_id[idx + len(sep):]  # suffix保持原样
-                    
-                    _LOGGER.debug(f"Token生成: prefix={prefix}, sep={sep}, suffix={suffix}")
-                    
-                    # Token算法: 后6位 + 分隔符 + 前6位
-                    if len(prefix) >= 12:
-                        stoken = prefix[6:12] + sep_upper + prefix[:6]
-                    else:
-                        stoken = prefix[len(prefix)//2:] + sep_upper + prefix[:len(prefix)//2]
-                    
-                    inner = hashlib.sha512(stoken.encode()).hexdigest()
-                    token = hashlib.sha512((inner + '_' + suffix).encode()).hexdigest()
-                    
-                    _LOGGER.debug(f"Token生成: stoken={stoken}, token前20={token[:20]}")
-                    return token
-            
-            # 无法识别格式，使用简单hash
-            return hashlib.sha512(device_id.encode()).hexdigest()
-            
+            return generate_device_token(device_id)
         except Exception as e:
-            _LOGGER.error(f"Token生成异常: {e}")
-            return None
\ No newline at end of file
+            _LOGGER.error("Token生成异常: %s", e)
+            return None
+
+
+class PanasonicOptionsFlow(config_entries.OptionsFlow):
+    """每个设备单独的轮询与请求选项, 保存后即时生效"""
+
+    def __init__(self, config_entry):
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        if self._entry.data.get(CONF_DEVICE_TYPE) == DEVICE_TYPE_HUMIDIFIER:
+            default_interval = DEFAULT_POLL_INTERVAL_HUMIDIFIER
+        else:
+            default_interval = DEFAULT_POLL_INTERVAL_AC
+        poll_interval = options.get(CONF_POLL_INTERVAL, default_interval)
+        request_timeout = options.get(CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Required(CONF_POLL_INTERVAL, default=poll_interval): vol.All(
+                    vol.Coerce(int), vol.Range(min=5, max=3600)
+                ),
+                vol.Required(CONF_REQUEST_TIMEOUT, default=request_timeout): vol.All(
+                    vol.Coerce(int), vol.Range(min=1, max=30)
+                ),
+                vol.Required(
+                    CONF_COMMAND_DEBOUNCE,
+                    default=options.get(CONF_COMMAND_DEBOUNCE, DEFAULT_COMMAND_DEBOUNCE),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=10)),
+                vol.Required(
+                    CONF_CONFIRM_WRITES, default=options.get(CONF_CONFIRM_WRITES, True)
+                ): bool,
+                vol.Required(
+                    CONF_HEDGE_READS, default=options.get(CONF_HEDGE_READS, False)
+                ): bool,
+            }),
+            # 展示该设备的预计请求速率, 便于规划整体云端调用量
+            description_placeholders={
+                "polls_per_minute": f"{60 / poll_interval:.1f}",
+            },
+        )
@@ -1,11 +1,3 @@
-from homeassistant.components.climate.const import (
-    HVACMode,
-    FAN_AUTO,
-    FAN_LOW,
-    FAN_MEDIUM,
-    FAN_HIGH,
-)
-
 DOMAIN = "panasonic_smart_china"
 
 CONF_USR_ID = "usrId"
@@ -15,11 +7,32 @@ CONF_SSID = "SSID"
 CONF_SENSOR_ID = "sensor_entity_id"
 CONF_CONTROLLER_MODEL = "controller_model"
 CONF_DEVICE_TYPE = "device_type"
+CONF_CONFIRM_WRITES = "confirm_writes"
+
+# 选项 (每个配置条目可单独调整, 修改后即时生效)
+CONF_POLL_INTERVAL = "poll_interval"
+CONF_REQUEST_TIMEOUT = "request_timeout"
+CONF_COMMAND_DEBOUNCE = "command_debounce"
+CONF_HEDGE_READS = "hedge_reads"
+
+DEFAULT_POLL_INTERVAL_AC = 15
+DEFAULT_POLL_INTERVAL_HUMIDIFIER = 30
+DEFAULT_REQUEST_TIMEOUT = 5
+DEFAULT_COMMAND_DEBOUNCE = 0
+
+# 可设置范围 (实体与批量服务共用)
+MIN_TEMP = 16
+MAX_TEMP = 30
+MIN_HUMIDITY = 40
+MAX_HUMIDITY = 70
 
 # 设备类型常量
 DEVICE_TYPE_AC = "ac"
 DEVICE_TYPE_HUMIDIFIER = "humidifier"
 
+# 空调线控器配置见 controllers.py (依赖空调平台常量, 仅在使用空调时加载)
+DEFAULT_CONTROLLER_MODEL = "CZ-RD501DW2"
+
 # 自定义风速常量
 FAN_MIN = "Min"    # 最低
 FAN_MAX = "Max"    # 最高
@@ -37,33 +50,6 @@ HUM_HUMIDITY_50 = 50
 HUM_HUMIDITY_60 = 60
 HUM_HUMIDITY_70 = 70
 
-# === 控制器配置数据库 ===
-SUPPORTED_CONTROLLERS = {
-    "CZ-RD501DW2": {
-        "name": "松下风管机线控器 CZ-RD501DW2",
-        "temp_scale": 2,
-        "hvac_mapping": {
-            HVACMode.COOL: 3,
-            HVACMode.HEAT: 4,
-            HVACMode.DRY: 2,
-            HVACMode.AUTO: 0,
-        },
-        # 基础风速映射 (windSet 数值)
-        "fan_mapping": {
-            FAN_AUTO: 10,   # 自动
-            FAN_MIN: 3,     # 最低
-            FAN_LOW: 4,     # 低
-            FAN_MEDIUM: 5,  # 中
-            FAN_HIGH: 6,    # 高
-            FAN_MAX: 7,     # 最高
-        },
-        # 特殊模式覆盖 (仅定义静音即可，其他走通用逻辑)
-        "fan_payload_overrides": {
-            FAN_MUTE: {"windSet": 10, "muteMode": 1}
-        }
-    }
-}
-
 # === 加湿器模式映射 ===
 HUMIDIFIER_MODE_MAPPING = {
     HUM_MODE_AUTO: 0,       # 自动模式
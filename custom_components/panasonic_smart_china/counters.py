@@ -0,0 +1,77 @@
+"""运行时长计数器: 每次轮询 O(1) 累加, 持久化保存, 无需查询历史数据库"""
+import logging
+import time
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.counters"
+# 计数器变化后延迟落盘 (秒), 避免每次轮询都写文件
+SAVE_DELAY = 300
+
+SIGNAL_COUNTERS_UPDATED = f"{DOMAIN}_counters_updated_{{}}"
+
+
+def async_get_counters(hass: HomeAssistant) -> "RuntimeCounters":
+    return hass.data[DOMAIN]["counters"]
+
+
+class RuntimeCounters:
+    """按设备累计运行秒数、各 runMode 秒数与各 windSet 秒数"""
+
+    def __init__(self, hass: HomeAssistant):
+        self._hass = hass
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        # 结构: {deviceId: {"on": 秒, "modes": {runMode: 秒}, "winds": {windSet: 秒}}}
+        self._data = {}
+        # 上一次采样 (不持久化): {deviceId: (monotonic, runStatus, runMode, windSet)}
+        self._last_sample = {}
+
+    async def async_load(self):
+        self._data = await self._store.async_load() or {}
+
+    @callback
+    def get(self, device_id) -> dict:
+        return self._data.get(device_id) or {"on": 0.0, "modes": {}, "winds": {}}
+
+    @callback
+    def async_observe(self, device_id, res: dict, max_gap: float):
+        """记录一次轮询结果; 上一次采样到本次之间的时间计入上一次的状态
+
+        两次采样间隔超过 max_gap (例如云端中断) 时, 这段时间状态未知, 不计入
+        """
+        now = time.monotonic()
+        sample = (now, res.get("runStatus"), res.get("runMode"), res.get("windSet"))
+        last = self._last_sample.get(device_id)
+        self._last_sample[device_id] = sample
+        if last is None:
+            return
+
+        elapsed = now - last[0]
+        if elapsed <= 0 or elapsed > max_gap or last[1] != 1:
+            return
+
+        counters = self._data.get(device_id)
+        if counters is None:
+            counters = self._data[device_id] = {"on": 0.0, "modes": {}, "winds": {}}
+        counters["on"] += elapsed
+        # JSON 存储的键只能是字符串
+        if last[2] is not None:
+            mode = str(last[2])
+            counters["modes"][mode] = counters["modes"].get(mode, 0.0) + elapsed
+        if last[3] is not None:
+            wind = str(last[3])
+            counters["winds"][wind] = counters["winds"].get(wind, 0.0) + elapsed
+
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        async_dispatcher_send(self._hass, SIGNAL_COUNTERS_UPDATED.format(device_id))
+
+    @callback
+    def _data_to_save(self):
+        return self._data
@@ -0,0 +1,73 @@
+"""增量写入: 只下发变化的字段, 按配置档 (线控器型号 / 接口) 自动探测云端是否支持"""
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.delta_writes"
+
+DELTA_UNKNOWN = "unknown"
+DELTA_SUPPORTED = "supported"
+DELTA_UNSUPPORTED = "unsupported"
+# 连续多少次增量写入被确认生效 (且未影响其他字段) 后视为支持
+PROBES_REQUIRED = 2
+
+
+def async_get_delta_support(hass: HomeAssistant) -> "DeltaWriteSupport":
+    return hass.data[DOMAIN]["delta"]
+
+
+class DeltaWriteSupport:
+    """记录每个配置档的探测结果, 重启后保留"""
+
+    def __init__(self, hass: HomeAssistant):
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        # 结构: {profile: {"state": DELTA_*, "probes": 已确认次数}}
+        self._data = {}
+        # 正在探测的配置档 (不持久化), 同一配置档同时只允许一次探测
+        self._probing = set()
+
+    async def async_load(self):
+        self._data = await self._store.async_load() or {}
+
+    @callback
+    def get(self, profile) -> str:
+        entry = self._data.get(profile)
+        return entry["state"] if entry else DELTA_UNKNOWN
+
+    @callback
+    def async_begin_probe(self, profile) -> bool:
+        """尝试占用该配置档的探测权, 已有探测进行中时返回 False"""
+        if profile in self._probing or self.get(profile) != DELTA_UNKNOWN:
+            return False
+        self._probing.add(profile)
+        return True
+
+    @callback
+    def async_end_probe(self, profile):
+        self._probing.discard(profile)
+
+    @callback
+    def async_report(self, profile, ok: bool):
+        """记录一次探测结果; 任何一次失败都会永久回退到完整写入"""
+        entry = self._data.setdefault(profile, {"state": DELTA_UNKNOWN, "probes": 0})
+        if entry["state"] != DELTA_UNKNOWN:
+            return
+        if not ok:
+            entry["state"] = DELTA_UNSUPPORTED
+            _LOGGER.info("%s: delta writes not supported, using full writes", profile)
+        else:
+            entry["probes"] += 1
+            if entry["probes"] >= PROBES_REQUIRED:
+                entry["state"] = DELTA_SUPPORTED
+                _LOGGER.info("%s: delta writes confirmed", profile)
+        self._store.async_delay_save(self._data_to_save, 1)
+
+    @callback
+    def _data_to_save(self):
+        return self._data
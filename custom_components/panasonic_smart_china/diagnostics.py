@@ -0,0 +1,35 @@
+"""诊断信息导出"""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, CONF_TOKEN, CONF_SSID, CONF_USR_ID, CONF_DEVICE_ID
+from .account import async_get_account
+
+TO_REDACT = {CONF_TOKEN, CONF_SSID, CONF_USR_ID}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """返回配置条目的诊断数据"""
+    data = {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "account": async_get_account(hass, entry.data[CONF_USR_ID]).as_dict(),
+    }
+
+    entity = hass.data[DOMAIN].get("entities", {}).get(entry.data[CONF_DEVICE_ID])
+    if entity is not None:
+        data["device"] = entity.diagnostics()
+        data["history"] = entity.history.as_dict()
+
+    hedge = hass.data[DOMAIN].get("hedge")
+    if hedge is not None:
+        data["hedge"] = hedge.as_dict()
+
+    tracer = hass.data[DOMAIN].get("trace")
+    if tracer is not None:
+        data["trace"] = {
+            "enabled": tracer.enabled,
+            "sample_rate": tracer.sample_rate,
+            "entries": tracer.dump(entry.data[CONF_DEVICE_ID]),
+        }
+    return data
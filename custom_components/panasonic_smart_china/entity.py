@@ -0,0 +1,502 @@
+"""松下设备实体公共基类: 配置读取、轮询生命周期与请求头"""
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from homeassistant.core import callback
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.event import async_call_later
+
+from .const import (
+    DOMAIN, CONF_USR_ID, CONF_DEVICE_ID, CONF_TOKEN, CONF_SSID, CONF_CONFIRM_WRITES,
+    CONF_POLL_INTERVAL, CONF_REQUEST_TIMEOUT, CONF_COMMAND_DEBOUNCE, CONF_HEDGE_READS,
+    DEFAULT_REQUEST_TIMEOUT, DEFAULT_COMMAND_DEBOUNCE,
+)
+from .account import async_get_account
+from .history import TelemetryHistory
+from .delta import DELTA_SUPPORTED, DELTA_UNKNOWN, async_get_delta_support
+from .hedge import async_get_hedge_policy
+from .pending import REPLAY_MIN_INTERVAL, async_get_pending
+from .watchdog import async_delete_stale_issue
+
+_LOGGER = logging.getLogger(__name__)
+
+# 写入后等待多久 (秒) 再读取确认
+CONFIRM_DELAY = 3
+
+
+class PanasonicBaseEntity(Entity):
+    """空调与加湿器共用的轮询逻辑"""
+
+    # 子类覆盖为各自平台的轮询频率
+    _polling_interval = timedelta(seconds=30)
+    # 写入时允许回传给云端的字段, 子类覆盖
+    _safe_keys = ()
+    # 探测增量写入时核对的控制字段: 未下发的字段必须保持不变
+    _delta_check_keys = ()
+    # 探测载荷中始终带上的字段 (开关机与模式), 探测失败也不会改变设备运行状态
+    _delta_guard_keys = ("runStatus", "runMode")
+    # 近期遥测缓冲区记录的字段, 子类覆盖
+    _history_fields = ()
+
+    def __init__(self, hass, config, name):
+        self._hass = hass
+        self._usr_id = config[CONF_USR_ID]
+        self._device_id = config[CONF_DEVICE_ID]
+        self._token = config[CONF_TOKEN]
+        self._ssid = config[CONF_SSID]
+        # 所属账号: 会话、连接池与轮询调度按账号隔离
+        self._account = async_get_account(hass, self._usr_id)
+        self._attr_name = name
+        self._attr_unique_id = f"panasonic_{self._device_id}"
+
+        self._last_params = {}
+        # 最近一次成功读取状态的时间 (monotonic), 看门狗据此判断数据是否过旧
+        self._last_success = None
+        self._added_at = time.monotonic()
+
+        # 轮询句柄 (由调度器分配错开的相位)
+        self._unsub_polling = None
+
+        # 进行中的状态读取, 保证每台设备同时最多一个读请求
+        self._fetch_task = None
+        self._skipped_polls = 0
+
+        # 离线写入队列 (持久化, 重启后仍会重放)
+        self._pending = async_get_pending(hass)
+        self._last_replay = 0.0
+
+        # 最近若干次轮询结果 (定长, 供诊断与 get_history 服务读取)
+        self.history = TelemetryHistory(self._history_fields)
+
+        # 增量写入支持情况 (按配置档探测)
+        self._delta = async_get_delta_support(hass)
+
+        # 写入确认 (延迟一次读取核对字段)
+        self._confirm_expected = {}
+        self._unsub_confirm = None
+
+        # 指令防抖: 窗口内的连续指令合并为一次写入
+        self._debounced_changes = {}
+        self._debounce_future = None
+
+        self._apply_options(config)
+
+    def _apply_options(self, config):
+        """读取选项 (轮询间隔 / 请求超时 / 防抖窗口 / 写入确认)"""
+        if config.get(CONF_POLL_INTERVAL):
+            self._polling_interval = timedelta(seconds=config[CONF_POLL_INTERVAL])
+        self._request_timeout = config.get(CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT)
+        self._command_debounce = config.get(CONF_COMMAND_DEBOUNCE, DEFAULT_COMMAND_DEBOUNCE)
+        self._confirm_writes = config.get(CONF_CONFIRM_WRITES, True)
+        self._hedge_reads = config.get(CONF_HEDGE_READS, False)
+
+    @callback
+    def async_apply_options(self, config):
+        """选项修改后即时生效, 无需重载条目"""
+        self._apply_options(config)
+        if self._unsub_polling:
+            self._unsub_polling.async_set_interval(self._polling_interval)
+        self.async_write_ha_state()
+
+    @property
+    def should_poll(self):
+        """关闭 HA 默认慢速轮询"""
+        return False
+
+    @property
+    def extra_state_attributes(self):
+        """展示轮询速率与尚未送达云端的指令"""
+        attrs = {
+            "poll_interval": int(self._polling_interval.total_seconds()),
+            "polls_per_minute": round(60 / self._polling_interval.total_seconds(), 2),
+        }
+        pending = self._pending.peek(self._device_id)
+        attrs["pending_writes"] = len(pending)
+        if pending:
+            attrs["pending_age"] = int(self._pending.age(self._device_id))
+        return attrs
+
+    def diagnostics(self) -> dict:
+        now = time.monotonic()
+        return {
+            "available": self._attr_available,
+            "last_success_age": (
+                round(now - self._last_success, 1) if self._last_success is not None else None
+            ),
+            "skipped_polls": self._skipped_polls,
+            "delta_writes": self._delta.get(self._write_profile),
+            "polling_active": (
+                self._unsub_polling is not None and not self._unsub_polling.is_stalled(now)
+            ),
+        }
+
+    async def async_added_to_hass(self):
+        """实体添加时启动定时轮询"""
+        await super().async_added_to_hass()
+        self._added_at = time.monotonic()
+        self._hass.data[DOMAIN].setdefault("entities", {})[self._device_id] = self
+        await self._async_prepare()
+        self._start_polling()
+
+    @callback
+    def _start_polling(self):
+        if self._unsub_polling:
+            self._unsub_polling.async_cancel()
+        self._unsub_polling = self._account.scheduler.async_register(
+            self._device_id,
+            self._polling_interval,
+            self._async_update_interval_wrapper,
+        )
+
+    @callback
+    def async_watchdog_check(self, now, stale_after):
+        """由看门狗定期调用: 重启丢失的轮询, 数据过旧时标记为不可用
+
+        返回数据已过旧的秒数, 未过旧时返回 None
+        """
+        if self._unsub_polling is None or self._unsub_polling.is_stalled(now):
+            _LOGGER.warning("%s: polling stalled, restarting", self._device_id)
+            self._start_polling()
+
+        age = now - (self._last_success or self._added_at)
+        if age <= stale_after:
+            return None
+        if self._attr_available:
+            _LOGGER.warning("%s: no successful update for %d s, marking unavailable", self._device_id, age)
+            self._attr_available = False
+            self.async_write_ha_state()
+        return age
+
+    async def async_will_remove_from_hass(self):
+        """实体移除时销毁定时器"""
+        if self._unsub_polling:
+            self._unsub_polling.async_cancel()
+            self._unsub_polling = None
+        if self._unsub_confirm:
+            self._unsub_confirm()
+            self._unsub_confirm = None
+        entities = self._hass.data[DOMAIN].get("entities", {})
+        if entities.get(self._device_id) is self:
+            del entities[self._device_id]
+            # 移除后看门狗不再检查该设备, 由这里清理它的修复提示
+            async_delete_stale_issue(self._hass, self._device_id)
+        await super().async_will_remove_from_hass()
+
+    async def _async_prepare(self):
+        """开始轮询前的准备工作, 子类按需覆盖"""
+
+    async def _async_update_interval_wrapper(self, now):
+        """定时器回调"""
+        if self._fetch_task and not self._fetch_task.done():
+            # 上一次读取尚未返回 (云端慢), 跳过本次触发而不是叠加请求
+            self._skipped_polls += 1
+            _LOGGER.debug("%s: status read still in flight, skipping poll", self._device_id)
+            return
+        self._pending.async_expire(self._device_id)
+        if await self._fetch_status(update_internal_state=True):
+            await self._async_replay_pending()
+        self.async_write_ha_state()
+
+    async def _async_replay_pending(self):
+        """云端恢复后重放离线期间的指令 (限速)"""
+        if not self._pending.get(self._device_id):
+            return
+        now = time.monotonic()
+        if now - self._last_replay < REPLAY_MIN_INTERVAL:
+            return
+        self._last_replay = now
+        _LOGGER.info("%s: replaying pending writes", self._device_id)
+        # 刚刚轮询成功, 直接复用该状态
+        await self._send_command({}, max_age=self._polling_interval.total_seconds())
+
+    async def async_update(self):
+        """轮询更新"""
+        await self._fetch_status(update_internal_state=True)
+
+    async def _fetch_status(self, update_internal_state=True):
+        """获取设备当前最新状态; 并发调用方共享同一个进行中的请求"""
+        task = self._fetch_task
+        if task is None or task.done():
+            task = self._fetch_task = self._hass.async_create_task(
+                self._async_read_status()
+            )
+        # shield: 某个调用方被取消时不影响其他共享该请求的调用方
+        res = await asyncio.shield(task)
+        # 只有实体状态按调用方决定是否更新, 其余处理每次响应只执行一次
+        if res and update_internal_state:
+            self._update_local_state(res)
+        return res
+
+    async def _async_read_status(self):
+        """共享读取任务: 请求状态并记录结果 (每次响应只处理一次)"""
+        res = await self._async_request_status()
+        if res:
+            self._last_success = time.monotonic()
+            self._attr_available = True
+            self._account.async_mark_session_ok(self._ssid)
+            self._on_status(res)
+            self.history.append(self._history_values(res))
+        return res
+
+    async def _async_read(self, url, payload, headers):
+        """状态读取请求; 开启对冲读取时, 慢请求会被再发一份, 先返回者胜出"""
+        def request():
+            return self._account.async_post(url, payload, headers, timeout=self._request_timeout)
+
+        if not self._hedge_reads:
+            return await request()
+        return await async_get_hedge_policy(self._hass).async_request(
+            url, request, self._request_timeout
+        )
+
+    def _on_status(self, res):
+        """每次成功读取到设备真实状态时调用, 子类按需覆盖"""
+
+    def _history_values(self, res):
+        """从 results 中取出遥测字段, 子类可覆盖以换算单位"""
+        return [res.get(field) for field in self._history_fields]
+
+    async def _send_command(self, changes, max_age=None):
+        """发送指令; 配置了防抖窗口时, 窗口内的指令合并后一起写入"""
+        if self._command_debounce <= 0:
+            return await self._async_send_now(changes, max_age)
+
+        self._debounced_changes.update(changes)
+        if self._debounce_future is None:
+            self._debounce_future = self._hass.loop.create_future()
+            self._hass.async_create_task(self._async_flush_debounced(max_age))
+        return await asyncio.shield(self._debounce_future)
+
+    async def _async_flush_debounced(self, max_age):
+        await asyncio.sleep(self._command_debounce)
+        changes, self._debounced_changes = self._debounced_changes, {}
+        future, self._debounce_future = self._debounce_future, None
+        try:
+            ok = await self._async_send_now(changes, max_age)
+        except Exception as err:  # 异常交给等待方处理, 后台任务不再重复抛出
+            future.set_exception(err)
+            return
+        future.set_result(ok)
+
+    async def _async_send_now(self, changes, max_age=None):
+        """Read-Modify-Write 核心逻辑, 写入成功返回 True
+
+        max_age: 若最近一次成功轮询距今不超过该秒数, 直接复用轮询结果, 省去读请求
+        写入失败时变更进入离线队列, 待云端恢复后重放
+        配置档已确认支持增量写入时只下发变化字段, 跳过读取
+        """
+        # 合并尚未送达的指令, 本次指令中的字段优先
+        command = changes
+        pending = self._pending.get(self._device_id)
+        if pending:
+            changes = {**pending, **changes}
+
+        # 已确认支持增量写入时只下发变化字段, 无需先读取完整状态;
+        # 尚未确认时同一配置档同时只允许一台设备探测, 其余指令照常完整写入
+        profile = self._write_profile
+        delta_state = self._delta.get(profile)
+        delta_params = {k: v for k, v in changes.items() if k in self._safe_keys}
+        use_delta = (
+            delta_state == DELTA_SUPPORTED and bool(self._last_params) and bool(delta_params)
+        )
+        probing = (
+            delta_state == DELTA_UNKNOWN
+            and bool(delta_params)
+            and self._delta.async_begin_probe(profile)
+        )
+        verifying = False
+        try:
+            # 1. Read
+            if use_delta:
+                latest_params = self._last_params
+            elif (
+                not probing
+                and max_age is not None
+                and self._last_success is not None
+                and time.monotonic() - self._last_success <= max_age
+            ):
+                latest_params = self._last_params
+            else:
+                # 探测时总是读取最新状态, 作为核对基准
+                latest_params = await self._fetch_status(update_internal_state=False)
+
+            if not latest_params:
+                _LOGGER.warning("Could not fetch latest status, using cached params.")
+                latest_params = self._last_params
+
+            # 2. Modify + 3. Filter
+            current_params, params = self._merge_params(latest_params, changes)
+            if probing:
+                # 探测载荷带上开关机与模式的目标值, 即使云端重置缺失字段也不会开关机或换模式
+                write_params = {
+                    **{k: current_params[k] for k in self._delta_guard_keys if k in current_params},
+                    **delta_params,
+                }
+            elif use_delta:
+                write_params = delta_params
+            else:
+                write_params = params
+
+            # 4. 乐观更新, 写入失败时回滚到写入前的状态
+            previous_params = self._last_params
+            self._update_local_state(current_params)
+            self._last_params = current_params
+            self.async_write_ha_state()
+
+            # 5. Write
+            try:
+                resp = await self._async_write_params(write_params)
+                if probing and _error_code(resp) not in (None, "", 0, "0"):
+                    # 云端拒绝增量参数: 记录后改用完整参数重写
+                    self._delta.async_report(profile, False)
+                    probing = False
+                    resp = await self._async_write_params(params)
+            except Exception as e:
+                _LOGGER.error("%s: set failed, queued for replay: %s", self._device_id, e)
+                # 已在队列中的字段保留原入队时间, 只有本次指令按当前时间入队
+                self._pending.async_add(self._device_id, command)
+                self._rollback(previous_params)
+                return False
+
+            error_code = _error_code(resp)
+            if error_code not in (None, "", 0, "0"):
+                # 云端明确拒绝: 重放也不会成功, 不进入离线队列;
+                # 合并进来的排队字段同样丢弃, 否则会阻塞之后的所有指令
+                _LOGGER.error("%s: set rejected by cloud, errorCode=%s", self._device_id, error_code)
+                if pending:
+                    _LOGGER.warning("%s: dropping pending writes %s", self._device_id, pending)
+                    self._pending.async_discard(self._device_id, pending)
+                self._rollback(previous_params)
+                return False
+
+            if pending:
+                # 只移除本次写入带上的字段, 写入期间新入队的字段保留
+                self._pending.async_discard(self._device_id, pending)
+
+            if probing:
+                verifying = True
+                self._hass.async_create_task(self._async_verify_delta(write_params, latest_params))
+        finally:
+            if probing and not verifying:
+                self._delta.async_end_probe(profile)
+
+        # 6. 可选: 延迟一次定向读取, 确认字段确实已生效
+        if self._confirm_writes:
+            self._schedule_confirm(delta_params)
+        return True
+
+    async def _async_verify_delta(self, written, before):
+        """探测增量写入: 字段须已生效, 且未下发的控制字段没有被云端重置"""
+        profile = self._write_profile
+        try:
+            await asyncio.sleep(CONFIRM_DELAY)
+            res = await self._fetch_status(update_internal_state=True)
+            if not res:
+                return
+            same = self._same_value
+            ok = all(same(k, v, res.get(k)) for k, v in written.items()) and all(
+                same(k, before.get(k), res.get(k))
+                for k in self._delta_check_keys if k not in written
+            )
+            self._delta.async_report(profile, ok)
+        finally:
+            self._delta.async_end_probe(profile)
+        if not ok:
+            _LOGGER.warning("%s: delta write changed other fields, rewriting full state", self._device_id)
+            restore = {k: before[k] for k in self._delta_check_keys if k in before}
+            await self._send_command({**restore, **written})
+        self.async_write_ha_state()
+
+    def _merge_params(self, base, changes):
+        """在最新状态上应用变更, 返回 (完整新状态, 允许回传的写入参数)"""
+        current_params = base.copy()
+        current_params.update(changes)
+        params = {k: v for k, v in current_params.items() if k in self._safe_keys}
+        return current_params, params
+
+    def _rollback(self, previous_params):
+        """撤销乐观更新"""
+        if previous_params:
+            self._update_local_state(previous_params)
+        self._last_params = previous_params
+        self.async_write_ha_state()
+
+    def _schedule_confirm(self, expected):
+        """安排一次确认读取; 连续写入时只保留最后一次"""
+        if self._unsub_confirm:
+            self._unsub_confirm()
+            expected = {**self._confirm_expected, **expected}
+        self._confirm_expected = expected
+        self._unsub_confirm = async_call_later(
+            self._hass, CONFIRM_DELAY, self._async_confirm_write
+        )
+
+    async def _async_confirm_write(self, now):
+        """读取设备真实状态, 与写入的字段比对"""
+        self._unsub_confirm = None
+        expected, self._confirm_expected = self._confirm_expected, {}
+        res = await self._fetch_status(update_internal_state=True)
+        if not res:
+            return
+        mismatched = {
+            k: (v, res.get(k)) for k, v in expected.items() if not self._same_value(k, v, res.get(k))
+        }
+        if mismatched:
+            _LOGGER.warning(
+                "%s: write not applied by device (expected, actual): %s",
+                self._device_id, mismatched,
+            )
+        self.async_write_ha_state()
+
+    @property
+    def _write_profile(self):
+        """增量写入探测的分组键 (同一配置档的设备共享探测结果), 由子类实现"""
+        raise NotImplementedError
+
+    def build_changes(self, change_set):
+        """批量服务用: 变更集 -> 云端参数, 未知模式或风速抛出 ValueError"""
+        return self._build_changes(change_set)
+
+    async def async_send_changes(self, changes, max_age=None):
+        """批量服务用: 写入云端参数 (走防抖、离线队列与确认), 成功返回 True"""
+        return await self._send_command(changes, max_age=max_age)
+
+    def _same_value(self, key, written, reported):
+        """写入值与设备回报值是否等价 (两侧先归一化)"""
+        return self._normalize_for_compare(key, written) == self._normalize_for_compare(key, reported)
+
+    def _normalize_for_compare(self, key, value):
+        """同一含义可能有多种编码时换算为统一值, 子类按需覆盖"""
+        return value
+
+    def _build_changes(self, change_set):
+        """将批量服务的变更集转换为云端参数, 由子类实现"""
+        raise NotImplementedError
+
+    async def _async_write_params(self, params):
+        """向云端写入参数并返回响应 JSON, 网络失败时抛出异常, 由子类实现"""
+        raise NotImplementedError
+
+    async def _async_request_status(self):
+        """向云端请求状态, 成功时返回 results 字典, 由子类实现"""
+        raise NotImplementedError
+
+    def _update_local_state(self, res):
+        """将 results 解析为实体状态, 由子类实现"""
+        raise NotImplementedError
+
+    def _get_headers(self):
+        return {
+            'Content-Type': 'application/json',
+            'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 18_5 like Mac OS X)',
+            'xtoken': f'SSID={self._ssid}',
+            'DNT': '1',
+            'Origin': 'https://app.psmartcloud.com',
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+
+
+def _error_code(resp):
+    return resp.get("errorCode") if isinstance(resp, dict) else None
@@ -0,0 +1,117 @@
+"""对冲读取: 状态读取迟迟未返回时再发一份相同请求, 先返回者胜出"""
+import asyncio
+import logging
+import time
+from collections import deque
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# 超过该分位数延迟仍未返回时发出对冲请求
+HEDGE_PERCENTILE = 0.95
+# 每个端点保留的延迟样本数; 样本不足时不对冲
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+# 对冲等待时间下限 (秒), 避免云端很快时也频繁对冲
+MIN_HEDGE_DELAY = 0.3
+# 全局预算: 对冲请求最多占读取请求的 10%, 允许短时突发 5 个
+BUDGET_RATIO = 0.1
+BUDGET_BURST = 5
+
+
+def async_get_hedge_policy(hass: HomeAssistant) -> "HedgePolicy":
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    policy = domain_data.get("hedge")
+    if policy is None:
+        policy = domain_data["hedge"] = HedgePolicy(hass)
+    return policy
+
+
+class HedgePolicy:
+    """所有设备共享的对冲策略与预算"""
+
+    def __init__(self, hass: HomeAssistant):
+        self._hass = hass
+        self._latencies = {}
+        self._tokens = float(BUDGET_BURST)
+        self.reads = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_exhausted = 0
+
+    def delay(self, key, timeout):
+        """按近期延迟分布计算对冲等待时间; 样本不足或已接近超时时返回 None"""
+        samples = self._latencies.get(key)
+        if not samples or len(samples) < MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        delay = max(ordered[int(len(ordered) * HEDGE_PERCENTILE)], MIN_HEDGE_DELAY)
+        if delay >= timeout:
+            return None
+        return delay
+
+    def _observe(self, key, latency):
+        samples = self._latencies.get(key)
+        if samples is None:
+            samples = self._latencies[key] = deque(maxlen=LATENCY_WINDOW)
+        samples.append(latency)
+
+    def _try_spend(self):
+        if self._tokens < 1:
+            self.budget_exhausted += 1
+            return False
+        self._tokens -= 1
+        return True
+
+    async def async_request(self, key, request, timeout):
+        """执行读取; request 为无参函数, 每次调用返回一个新的请求协程"""
+        self.reads += 1
+        self._tokens = min(BUDGET_BURST, self._tokens + BUDGET_RATIO)
+        started = time.monotonic()
+        primary = self._hass.async_create_task(request())
+        tasks = {primary}
+        try:
+            delay = self.delay(key, timeout)
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._try_spend():
+                    self.hedged += 1
+                    _LOGGER.debug("%s: no response after %.2f s, hedging", key, delay)
+                    tasks.add(self._hass.async_create_task(request()))
+
+            # 先成功返回者胜出; 一个失败时继续等另一个
+            error = None
+            pending = tasks
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        self._observe(key, time.monotonic() - started)
+                        return task.result()
+                    error = task.exception()
+            # 失败/超时同样计入延迟分布 (按超时值), 否则云端劣化时对冲等待时间会偏低
+            self._observe(key, timeout)
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def as_dict(self) -> dict:
+        """诊断信息: 对冲率与对冲请求胜出率"""
+        return {
+            "reads": self.reads,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.reads, 4) if self.reads else 0.0,
+            "hedge_win_rate": round(self.hedge_wins / self.hedged, 4) if self.hedged else 0.0,
+            "budget_exhausted": self.budget_exhausted,
+            "budget_tokens": round(self._tokens, 2),
+            "hedge_delay": {
+                key: self.delay(key, float("inf")) for key in self._latencies
+            },
+        }
@@ -0,0 +1,60 @@
+"""设备近期遥测的环形缓冲区: 定长 array 存储, 内存占用恒定, 无需查询 recorder"""
+import math
+import time
+from array import array
+
+# 每台设备保留的轮询样本数 (按 15 秒轮询约 1.5 小时)
+HISTORY_SIZE = 360
+
+_NAN = float("nan")
+
+
+class TelemetryHistory:
+    """按列存储最近 size 次成功轮询的数值字段, 缺失或非数值记为 NaN"""
+
+    def __init__(self, fields, size=HISTORY_SIZE):
+        self.fields = tuple(fields)
+        self.size = size
+        self._times = array("d", [0.0]) * size
+        self._columns = [array("d", [_NAN]) * size for _ in self.fields]
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, values, timestamp=None):
+        """写入一次样本; values 与 fields 一一对应"""
+        i = self._next
+        self._times[i] = time.time() if timestamp is None else timestamp
+        for column, value in zip(self._columns, values):
+            try:
+                column[i] = _NAN if value is None else float(value)
+            except (TypeError, ValueError):
+                column[i] = _NAN
+        self._next = (i + 1) % self.size
+        if self._count < self.size:
+            self._count += 1
+
+    def samples(self, since=None) -> list:
+        """按时间顺序返回 [时间戳, 字段值...]; since 为 UNIX 时间戳下限"""
+        start = (self._next - self._count) % self.size
+        rows = []
+        for k in range(self._count):
+            i = (start + k) % self.size
+            timestamp = self._times[i]
+            if since is not None and timestamp < since:
+                continue
+            row = [round(timestamp, 1)]
+            for column in self._columns:
+                value = column[i]
+                row.append(None if math.isnan(value) else value)
+            rows.append(row)
+        return rows
+
+    def as_dict(self, since=None) -> dict:
+        return {
+            "fields": ["time", *self.fields],
+            "size": self.size,
+            "samples": self.samples(since),
+        }
@@ -1,6 +1,5 @@
 """松下智能加湿器 Home Assistant 集成"""
 import logging
-import async_timeout
 from datetime import timedelta
 
 from homeassistant.components.humidifier import (
@@ -8,14 +7,15 @@ from homeassistant.components.humidifier import (
     HumidifierEntityFeature,
     HumidifierDeviceClass,
 )
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.exceptions import HomeAssistantError
 
 from .const import (
-    CONF_USR_ID, CONF_DEVICE_ID, CONF_TOKEN, CONF_SSID, CONF_DEVICE_TYPE,
+    CONF_DEVICE_TYPE,
     DEVICE_TYPE_HUMIDIFIER, HUMIDIFIER_MODE_MAPPING, HUMIDIFIER_HUMIDITY_MAPPING,
     HUM_MODE_AUTO, HUM_MODE_CONTINUOUS, HUM_MODE_SLEEP, HUM_MODE_INTERVAL,
+    DEFAULT_POLL_INTERVAL_HUMIDIFIER, MIN_HUMIDITY, MAX_HUMIDITY,
 )
+from .entity import PanasonicBaseEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,15 +29,63 @@ URL_HUM_GET_AW = "https://app.psmartcloud.com/App/HumDevGetStatusInfoAW"
 URL_DEV_SET = "https://app.psmartcloud.com/App/DevSetStatusInfo"
 URL_DEV_GET = "https://app.psmartcloud.com/App/DevGetStatusInfo"
 
-POLLING_INTERVAL = timedelta(seconds=30)
+POLLING_INTERVAL = timedelta(seconds=DEFAULT_POLL_INTERVAL_HUMIDIFIER)
+
+# 写入时允许回传的字段 (加湿器参数)
+SAFE_KEYS = [
+    "runStatus", "runMode", "setHumidity", "windSet",
+    "muteMode", "nanoe", "nanoeG", "childLock",
+    "waterLevel", "filterReset", "buzzer", "lightMode",
+    "timerOn", "timerOff", "currentHumidity", "insideHumidity",
+]
 
 # 加湿器模式列表
 AVAILABLE_MODES = [HUM_MODE_AUTO, HUM_MODE_CONTINUOUS, HUM_MODE_SLEEP, HUM_MODE_INTERVAL]
 
+# 当前湿度可能使用的字段名 (按优先级)
+HUMIDITY_FIELDS = ("currentHumidity", "insideHumidity", "humidity")
+
+
+class HumidifierProfile:
+    """预先编译的加湿器映射: 轮询和下发指令时只做字典查找"""
+
+    def __init__(self, mode_mapping, humidity_mapping, humidity_fields):
+        self.mode_by_value = {val: mode for mode, val in mode_mapping.items()}
+        self.humidity_fields = humidity_fields
+
+        self._min = min(humidity_mapping)
+        self._max = max(humidity_mapping)
+        # setHumidity 原始值 -> 目标湿度: 档位值 (0-3) 与直接湿度值 (40-70) 合并为一张表
+        self.target_by_raw = {h: h for h in range(self._min, self._max + 1)}
+        self.target_by_raw.update({level: h for h, level in humidity_mapping.items()})
+        # 每个整数湿度预先算好最接近的档位 (距离相同时取较低档, 与原逻辑一致)
+        levels = sorted(humidity_mapping.items())
+        self._level_by_humidity = {
+            h: min(levels, key=lambda item: abs(item[0] - h))[1]
+            for h in range(self._min, self._max + 1)
+        }
+
+    def quantize(self, humidity):
+        """湿度值 -> 最接近的API档位"""
+        h = min(max(int(round(humidity)), self._min), self._max)
+        return self._level_by_humidity[h]
+
+    def resolve_humidity_field(self, res):
+        for field in self.humidity_fields:
+            if res.get(field) is not None:
+                return field
+        return None
+
+
+HUMIDIFIER_PROFILE = HumidifierProfile(
+    HUMIDIFIER_MODE_MAPPING, HUMIDIFIER_HUMIDITY_MAPPING, HUMIDITY_FIELDS
+)
+
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """设置加湿器实体"""
-    config = entry.data
+    # 选项覆盖配置数据
+    config = {**entry.data, **entry.options}
     
     # 仅为加湿器类型设备创建实体
     if config.get(CONF_DEVICE_TYPE) != DEVICE_TYPE_HUMIDIFIER:
@@ -46,65 +94,39 @@ async def async_setup_entry(hass, entry, async_add_entities):
     async_add_entities([PanasonicHumidifierEntity(hass, config, entry.title)])
 
 
-class PanasonicHumidifierEntity(HumidifierEntity):
+class PanasonicHumidifierEntity(PanasonicBaseEntity, HumidifierEntity):
     """松下智能加湿器实体"""
     
     _attr_device_class = HumidifierDeviceClass.HUMIDIFIER
     _attr_supported_features = HumidifierEntityFeature.MODES
     _attr_available_modes = AVAILABLE_MODES
-    _attr_min_humidity = 40
-    _attr_max_humidity = 70
+    _attr_min_humidity = MIN_HUMIDITY
+    _attr_max_humidity = MAX_HUMIDITY
+    _polling_interval = POLLING_INTERVAL
+    _safe_keys = SAFE_KEYS
+    _delta_check_keys = ("runStatus", "runMode", "setHumidity")
+    # currentHumidity 列取自该型号实际使用的湿度字段 (见 HUMIDITY_FIELDS)
+    _history_fields = ("runStatus", "runMode", "setHumidity", "currentHumidity")
     
     def __init__(self, hass, config, name):
-        self._hass = hass
-        self._usr_id = config[CONF_USR_ID]
-        self._device_id = config[CONF_DEVICE_ID]
-        self._token = config[CONF_TOKEN]
-        self._ssid = config[CONF_SSID]
-        self._attr_name = name
-        self._attr_unique_id = f"panasonic_{self._device_id}"
+        super().__init__(hass, config, name)
         
         # 内部状态
         self._is_on = False
         self._mode = HUM_MODE_AUTO
         self._target_humidity = 50
         self._current_humidity = None
-        self._last_params = {}
-        
-        # 定时器句柄
-        self._unsub_polling = None
+        self._profile = HUMIDIFIER_PROFILE
+        # 实际使用的当前湿度字段, 首个有效载荷后确定
+        self._humidity_field = None
         
         # API端点选择 (运行时确定)
         self._url_get = None
         self._url_set = None
 
-    @property
-    def should_poll(self):
-        """关闭 HA 默认慢速轮询"""
-        return False
-
-    async def async_added_to_hass(self):
-        """实体添加时启动定时轮询"""
-        await super().async_added_to_hass()
-        # 首次更新时自动探测正确的API端点
+    async def _async_prepare(self):
+        """首次轮询前自动探测正确的API端点"""
         await self._detect_api_endpoints()
-        self._unsub_polling = async_track_time_interval(
-            self._hass,
-            self._async_update_interval_wrapper,
-            POLLING_INTERVAL
-        )
-
-    async def async_will_remove_from_hass(self):
-        """实体移除时销毁定时器"""
-        if self._unsub_polling:
-            self._unsub_polling()
-            self._unsub_polling = None
-        await super().async_will_remove_from_hass()
-
-    async def _async_update_interval_wrapper(self, now):
-        """定时器回调"""
-        await self.async_update()
-        self.async_write_ha_state()
 
     @property
     def is_on(self):
@@ -132,12 +154,7 @@ class PanasonicHumidifierEntity(HumidifierEntity):
             "token": self._token
         }
         
-        # 调试日志：打印请求信息
-        _LOGGER.warning(f"[DEBUG] === 开始探测API端点 ===")
-        _LOGGER.warning(f"[DEBUG] deviceId: {self._device_id}")
-        _LOGGER.warning(f"[DEBUG] usrId: {self._usr_id}")
-        _LOGGER.warning(f"[DEBUG] token前20字符: {self._token[:20] if self._token else 'None'}...")
-        _LOGGER.warning(f"[DEBUG] SSID: {self._ssid}")
+        _LOGGER.debug("开始探测API端点: deviceId=%s", self._device_id)
         
         # 尝试不同的API端点 (按优先级排序)
         # 松下云可能对所有设备使用统一的AC端点，也可能有专用的加湿器端点
@@ -160,30 +177,25 @@ class PanasonicHumidifierEntity(HumidifierEntity):
              "https://app.psmartcloud.com/App/DevSetStatusInfoAW"),
         ]
         
-        session = async_get_clientsession(self._hass)
-        
         for get_url, set_url in endpoints_to_try:
             try:
-                async with async_timeout.timeout(5):
-                    response = await session.post(get_url, json=payload, headers=headers, ssl=False)
-                    json_data = await response.json()
-                    
-                    # 详细日志：记录每个端点的响应
-                    _LOGGER.warning(f"[DEBUG] 尝试端点: {get_url}")
-                    _LOGGER.warning(f"[DEBUG] 响应状态: {response.status}, 内容: {json_data}")
+                json_data = await self._account.async_post(
+                    get_url, payload, headers, timeout=self._request_timeout
+                )
+                
+                _LOGGER.debug("尝试端点 %s: errorCode=%s", get_url, json_data.get('errorCode'))
+                
+                # 检查是否为有效响应
+                if 'results' in json_data:
+                    self._url_get = get_url
+                    self._url_set = set_url
+                    _LOGGER.info("加湿器API端点探测成功: GET=%s", get_url)
                     
-                    error_code = json_data.get('errorCode')
-                    # 检查是否为有效响应
-                    if 'results' in json_data:
-                        self._url_get = get_url
-                        self._url_set = set_url
-                        _LOGGER.info(f"加湿器API端点探测成功: GET={get_url}")
-                        
-                        # 解析初始状态
-                        self._update_local_state(json_data['results'])
-                        return
+                    # 解析初始状态
+                    self._update_local_state(json_data['results'])
+                    return
             except Exception as e:
-                _LOGGER.warning(f"[DEBUG] 端点 {get_url} 异常: {e}")
+                _LOGGER.debug("端点 %s 异常: %s", get_url, e)
                 continue
         
         # 所有端点都失败，使用最常见的空调API作为默认
@@ -191,12 +203,8 @@ class PanasonicHumidifierEntity(HumidifierEntity):
         self._url_get = "https://app.psmartcloud.com/App/ACDevGetStatusInfoAW"
         self._url_set = "https://app.psmartcloud.com/App/ACDevSetStatusInfoAW"
 
-    async def async_update(self):
-        """轮询更新状态"""
-        await self._fetch_status(update_internal_state=True)
-
-    async def _fetch_status(self, update_internal_state=True):
-        """获取设备当前状态"""
+    async def _async_request_status(self):
+        """向云端请求设备当前状态"""
         if not self._url_get:
             await self._detect_api_endpoints()
             return None
@@ -210,34 +218,46 @@ class PanasonicHumidifierEntity(HumidifierEntity):
         }
         
         try:
-            session = async_get_clientsession(self._hass)
-            async with async_timeout.timeout(5):
-                response = await session.post(self._url_get, json=payload, headers=headers, ssl=False)
-                json_data = await response.json()
-                
-                if json_data.get('errorCode') in ['3003', '3004']:
-                    _LOGGER.error("SSID expired for humidifier.")
-                    return None
-                
-                # 调试日志：打印完整API响应
-                _LOGGER.warning(f"[DEBUG] 加湿器API响应: {json_data}")
-                
-                if 'results' in json_data:
-                    res = json_data['results']
-                    self._last_params = res
-                    
-                    # 调试日志：打印results内容
-                    _LOGGER.warning(f"[DEBUG] 加湿器状态数据: {res}")
-                    
-                    if update_internal_state:
-                        self._update_local_state(res)
-                    
-                    return res
+            json_data = await self._async_read(self._url_get, payload, headers)
+            
+            if json_data.get('errorCode') in ['3003', '3004']:
+                _LOGGER.error("SSID expired for humidifier.")
+                self._account.async_mark_session_expired(self._ssid)
+                return None
+            
+            if 'results' in json_data:
+                res = json_data['results']
+                self._last_params = res
+                return res
         except Exception as e:
-            _LOGGER.debug(f"获取加湿器状态失败: {e}")
+            _LOGGER.debug("获取加湿器状态失败: %s", e)
             return None
         return None
 
+    def _normalize_for_compare(self, key, value):
+        """setHumidity 写入的是档位 (0-3), 部分型号回报湿度值 (40-70), 统一为百分比"""
+        if key == "setHumidity":
+            return self._profile.target_by_raw.get(value, value)
+        return value
+
+    def _history_values(self, res):
+        """目标湿度按档位换算为百分比 (档位 1 -> 50%)"""
+        values = super()._history_values(res)
+        i = self._history_fields.index("setHumidity")
+        values[i] = self._profile.target_by_raw.get(values[i])
+        field = self._resolve_humidity_field(res)
+        values[self._history_fields.index("currentHumidity")] = (
+            res[field] if field is not None else None
+        )
+        return values
+
+    def _resolve_humidity_field(self, res):
+        """当前湿度字段 (不同型号字段名不同, 首次解析后记住实际使用的字段)"""
+        field = self._humidity_field
+        if field is None or field not in res:
+            field = self._humidity_field = self._profile.resolve_humidity_field(res)
+        return field
+
     def _update_local_state(self, res):
         """更新HA实体状态 (兼容空调API返回格式)"""
         if not res:
@@ -247,37 +267,18 @@ class PanasonicHumidifierEntity(HumidifierEntity):
         self._is_on = res.get('runStatus', 0) == 1
         
         # 运行模式
-        run_mode = res.get('runMode', 0)
-        mode_found = False
-        for mode_name, mode_val in HUMIDIFIER_MODE_MAPPING.items():
-            if mode_val == run_mode:
-                self._mode = mode_name
-                mode_found = True
-                break
-        if not mode_found:
-            self._mode = HUM_MODE_AUTO
+        self._mode = self._profile.mode_by_value.get(res.get('runMode', 0), HUM_MODE_AUTO)
         
         # 目标湿度 - 支持两种格式：档位值(0-3)或直接湿度值(40-70)
-        humidity_val = res.get('setHumidity', 1)
-        if humidity_val in HUMIDIFIER_HUMIDITY_MAPPING.values():
-            # 档位值格式
-            for humidity, level in HUMIDIFIER_HUMIDITY_MAPPING.items():
-                if level == humidity_val:
-                    self._target_humidity = humidity
-                    break
-        elif 40 <= humidity_val <= 70:
-            # 直接湿度值格式
-            self._target_humidity = humidity_val
+        target = self._profile.target_by_raw.get(res.get('setHumidity', 1))
+        if target is not None:
+            self._target_humidity = target
         
-        # 当前湿度 (API可能使用不同的字段名)
-        current = (
-            res.get('currentHumidity') or 
-            res.get('insideHumidity') or 
-            res.get('humidity')
-        )
-        if current is not None:
+        # 当前湿度
+        field = self._resolve_humidity_field(res)
+        if field is not None:
             try:
-                self._current_humidity = int(current)
+                self._current_humidity = int(res[field])
             except (ValueError, TypeError):
                 pass
 
@@ -289,50 +290,43 @@ class PanasonicHumidifierEntity(HumidifierEntity):
         """关闭加湿器"""
         await self._send_command({"runStatus": 0})
 
+    def _humidity_level(self, humidity):
+        """将湿度值映射到API档位"""
+        return self._profile.quantize(humidity)
+
+    @property
+    def _write_profile(self):
+        return f"humidifier:{self._url_set}"
+
+    def _build_changes(self, change_set):
+        """将批量服务的变更集转换为云端参数, 未知模式抛出 ValueError"""
+        changes = {}
+        if "power" in change_set:
+            changes["runStatus"] = 1 if change_set["power"] else 0
+        if "humidity" in change_set:
+            changes["setHumidity"] = self._humidity_level(change_set["humidity"])
+        if "mode" in change_set:
+            mode = change_set["mode"].lower()
+            if mode not in HUMIDIFIER_MODE_MAPPING:
+                raise ValueError(f"Unsupported mode: {change_set['mode']}")
+            changes["runMode"] = HUMIDIFIER_MODE_MAPPING[mode]
+        return changes
+
     async def async_set_humidity(self, humidity: int):
         """设置目标湿度"""
-        # 将湿度值映射到API档位
-        target_level = HUMIDIFIER_HUMIDITY_MAPPING.get(humidity)
-        if target_level is None:
-            # 找最接近的档位
-            closest = min(HUMIDIFIER_HUMIDITY_MAPPING.keys(), key=lambda x: abs(x - humidity))
-            target_level = HUMIDIFIER_HUMIDITY_MAPPING[closest]
-        
-        await self._send_command({"setHumidity": target_level})
+        await self._send_command({"setHumidity": self._humidity_level(humidity)})
 
     async def async_set_mode(self, mode: str):
         """设置运行模式"""
-        mode_val = HUMIDIFIER_MODE_MAPPING.get(mode, 0)
-        await self._send_command({"runMode": mode_val})
+        if mode not in HUMIDIFIER_MODE_MAPPING:
+            raise HomeAssistantError(f"Unsupported mode: {mode}")
+        await self._send_command({"runMode": HUMIDIFIER_MODE_MAPPING[mode]})
 
-    async def _send_command(self, changes: dict):
-        """发送控制命令 (Read-Modify-Write)"""
+    async def _async_write_params(self, params):
+        """写入过滤后的完整参数"""
         if not self._url_set:
-            _LOGGER.error("加湿器API端点未初始化")
-            return
+            raise HomeAssistantError("加湿器API端点未初始化")
         
-        # 1. Read
-        latest_params = await self._fetch_status(update_internal_state=False)
-        
-        if latest_params:
-            current_params = latest_params.copy()
-        else:
-            _LOGGER.warning("无法获取最新状态，使用缓存参数")
-            current_params = self._last_params.copy()
-        
-        # 2. Modify
-        current_params.update(changes)
-        
-        # 3. Filter - 加湿器参数
-        safe_keys = [
-            "runStatus", "runMode", "setHumidity", "windSet",
-            "muteMode", "nanoe", "nanoeG", "childLock",
-            "waterLevel", "filterReset", "buzzer", "lightMode",
-            "timerOn", "timerOff", "currentHumidity", "insideHumidity",
-        ]
-        params = {k: v for k, v in current_params.items() if k in safe_keys}
-        
-        # 4. Write
         headers = self._get_headers()
         request_body = {
             "id": 200,
@@ -342,35 +336,6 @@ class PanasonicHumidifierEntity(HumidifierEntity):
             "params": params
         }
         
-        # 调试日志：打印发送的请求
-        _LOGGER.warning(f"[DEBUG] 发送控制命令到: {self._url_set}")
-        _LOGGER.warning(f"[DEBUG] 请求参数: {request_body}")
-        
-        try:
-            session = async_get_clientsession(self._hass)
-            async with async_timeout.timeout(10):
-                response = await session.post(self._url_set, json=request_body, headers=headers, ssl=False)
-                resp_json = await response.json()
-                
-                # 调试日志：打印API响应
-                _LOGGER.warning(f"[DEBUG] 控制命令响应: {resp_json}")
-                
-                # 5. 更新本地状态 (乐观更新)
-                self._update_local_state(current_params)
-                self._last_params = current_params
-                
-                # 6. 强制刷新HA界面
-                self.async_write_ha_state()
-                
-        except Exception as e:
-            _LOGGER.error(f"加湿器控制命令发送失败: {e}")
-
-    def _get_headers(self):
-        return {
-            'Content-Type': 'application/json',
-            'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 18_5 like Mac OS X)',
-            'xtoken': f'SSID={self._ssid}',
-            'DNT': '1',
-            'Origin': 'https://app.psmartcloud.com',
-            'X-Requested-With': 'XMLHttpRequest'
-        }
+        return await self._account.async_post(
+            self._url_set, request_body, headers, timeout=self._request_timeout * 2
+        )
@@ -0,0 +1,111 @@
+"""离线写入队列: 云端不可达时暂存用户指令, 恢复后自动重放"""
+import logging
+import time
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.pending_writes"
+# 超过该时长 (秒) 的指令不再重放, 避免几天后突然开机
+MAX_PENDING_AGE = 6 * 3600
+# 同一设备两次重放之间的最小间隔 (秒)
+REPLAY_MIN_INTERVAL = 60
+
+
+def async_get_pending(hass: HomeAssistant) -> "PendingWrites":
+    """获取全局离线写入队列"""
+    return hass.data[DOMAIN]["pending"]
+
+
+class PendingWrites:
+    """按设备保存待写入字段, 同一字段只保留最新的期望值及其入队时间"""
+
+    def __init__(self, hass: HomeAssistant):
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        # 结构: {deviceId: {"changes": {字段: 值}, "times": {字段: 最近一次入队的时间戳}}}
+        self._data = {}
+
+    async def async_load(self):
+        data = await self._store.async_load() or {}
+        for entry in data.values():
+            # 旧格式只有整体的 "since"
+            if "times" not in entry:
+                since = entry.pop("since", time.time())
+                entry["times"] = {k: since for k in entry["changes"]}
+        self._data = data
+
+    @callback
+    def get(self, device_id) -> dict:
+        """返回待写入字段的副本, 过期的字段会先被丢弃"""
+        self.async_expire(device_id)
+        return dict(self.peek(device_id))
+
+    @callback
+    def peek(self, device_id) -> dict:
+        """只读: 返回当前待写入字段, 不做过期处理 (供状态属性使用)"""
+        entry = self._data.get(device_id)
+        return entry["changes"] if entry else {}
+
+    @callback
+    def async_expire(self, device_id):
+        """丢弃超过 MAX_PENDING_AGE 的字段 (每个字段单独计时)"""
+        entry = self._data.get(device_id)
+        if not entry:
+            return
+        cutoff = time.time() - MAX_PENDING_AGE
+        expired = [k for k, since in entry["times"].items() if since < cutoff]
+        if not expired:
+            return
+        _LOGGER.warning(
+            "%s: dropping expired pending writes %s",
+            device_id, {k: entry["changes"][k] for k in expired},
+        )
+        for k in expired:
+            del entry["changes"][k]
+            del entry["times"][k]
+        if not entry["changes"]:
+            del self._data[device_id]
+        self._store.async_delay_save(self._data_to_save, 1)
+
+    @callback
+    def age(self, device_id):
+        """最早一条待写入指令的等待时长 (秒)"""
+        entry = self._data.get(device_id)
+        if not entry:
+            return None
+        return time.time() - min(entry["times"].values())
+
+    @callback
+    def async_add(self, device_id, changes: dict):
+        """入队; 再次入队的字段以最新的值和时间为准"""
+        entry = self._data.setdefault(device_id, {"changes": {}, "times": {}})
+        now = time.time()
+        entry["changes"].update(changes)
+        entry["times"].update({k: now for k in changes})
+        self._store.async_delay_save(self._data_to_save, 1)
+
+    @callback
+    def async_discard(self, device_id, changes: dict):
+        """移除已送达 (或被拒绝) 的字段; 期间被新指令覆盖的字段保留"""
+        entry = self._data.get(device_id)
+        if not entry:
+            return
+        removed = False
+        for k, v in changes.items():
+            if k in entry["changes"] and entry["changes"][k] == v:
+                del entry["changes"][k]
+                del entry["times"][k]
+                removed = True
+        if not entry["changes"]:
+            del self._data[device_id]
+        if removed:
+            self._store.async_delay_save(self._data_to_save, 1)
+
+    @callback
+    def _data_to_save(self):
+        return self._data
@@ -0,0 +1,92 @@
+"""按需性能剖析: 限时的 cProfile 会话, 报告只保留本集成的函数
+
+Python 3.12 之前 cProfile 只作用于启用它的线程 (即事件循环); 3.12 起基于
+sys.monitoring, 会话期间整个进程 (含 executor 线程) 都会产生剖析开销,
+但报告只保留本集成的函数。未开启会话时没有任何额外开销。
+协程每次恢复执行都会被计为一次调用, 累计耗时包含其调用的 JSON 解析与状态写入。
+"""
+import cProfile
+import logging
+import os
+import pstats
+import time
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# 服务响应中返回的函数条数 (报告文件中保留全部)
+RESPONSE_ROWS = 20
+
+
+class ProfileSession:
+    """一次剖析会话"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.duration = None
+        self.rows = []
+        self._profiler = cProfile.Profile()
+        self._started = time.monotonic()
+
+    def start(self):
+        try:
+            self._profiler.enable()
+        except ValueError as err:  # 已有其他剖析工具在运行 (例如 profiler 集成)
+            raise HomeAssistantError(f"Cannot start profiling: {err}") from err
+
+    def stop(self):
+        self._profiler.disable()
+        self.duration = time.monotonic() - self._started
+
+    def build_report(self):
+        """汇总本集成函数的调用次数与耗时并写入报告 (阻塞, 需在 executor 中调用)"""
+        stats = pstats.Stats(self._profiler)
+        rows = []
+        for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            if not filename.startswith(PACKAGE_DIR):
+                continue
+            rows.append({
+                "function": f"{os.path.relpath(filename, PACKAGE_DIR)}:{line}({func})",
+                "calls": calls,
+                "total_time": round(tottime, 6),
+                "cumulative_time": round(cumtime, 6),
+            })
+        rows.sort(key=lambda row: row["cumulative_time"], reverse=True)
+        self.rows = rows
+
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(f"{DOMAIN} profile, {self.duration:.1f} s\n\n")
+            f.write(f"{'calls':>10} {'tottime':>10} {'cumtime':>10}  function\n")
+            for row in rows:
+                f.write(
+                    f"{row['calls']:>10} {row['total_time']:>10.4f} "
+                    f"{row['cumulative_time']:>10.4f}  {row['function']}\n"
+                )
+
+
+def async_start_profile(hass: HomeAssistant, path: str) -> ProfileSession:
+    session = ProfileSession(path)
+    session.start()
+    hass.data[DOMAIN]["profile"] = session
+    _LOGGER.warning("Profiling started, report will be written to %s", path)
+    return session
+
+
+async def async_stop_profile(hass: HomeAssistant, session=None):
+    """结束会话并写入报告, 返回会话; 没有进行中的会话时返回 None
+
+    session: 只结束指定的会话 (定时自动结束时使用, 避免误停后来开启的会话)
+    """
+    current = hass.data[DOMAIN].get("profile")
+    if current is None or (session is not None and current is not session):
+        return None
+    del hass.data[DOMAIN]["profile"]
+    current.stop()
+    await hass.async_add_executor_job(current.build_report)
+    _LOGGER.info("Profile saved: %s (%d functions)", current.path, len(current.rows))
+    return current
@@ -0,0 +1,151 @@
+"""轮询调度器: 错开各设备的轮询相位，避免所有设备同时请求云端"""
+import logging
+import random
+import time
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER = logging.getLogger(__name__)
+
+# 每个周期叠加的随机抖动 (占轮询间隔的比例, 正负对称)
+JITTER_RATIO = 0.05
+# 统计突发并发的时间窗口 (秒): 窗口内触发的轮询视为同一波
+BURST_WINDOW = 1.0
+# 黄金分割相位序列: 无需预知设备总数即可把相位均匀铺满整个周期
+_GOLDEN_RATIO = 0.6180339887498949
+
+
+class PollHandle:
+    """单个设备的轮询任务"""
+
+    def __init__(self, scheduler, key, interval: timedelta, phase: float, action):
+        self._scheduler = scheduler
+        self.key = key
+        self.interval = interval
+        self.phase = phase  # 0~1, 在周期内的相对位置
+        self._action = action
+        self._next_due = None
+        self._unsub = None
+        self.started = None
+        self.last_fired = None
+
+    @callback
+    def async_start(self):
+        """按分配的相位安排第一次轮询"""
+        seconds = self.interval.total_seconds()
+        self.started = time.monotonic()
+        self._next_due = time.monotonic() + self.phase * seconds
+        self._schedule()
+
+    @callback
+    def async_cancel(self):
+        if self._unsub:
+            self._unsub()
+            self._unsub = None
+        if self._scheduler._handles.get(self.key) is self:
+            del self._scheduler._handles[self.key]
+
+    @callback
+    def async_set_interval(self, interval: timedelta):
+        """修改轮询间隔, 保持原有相位"""
+        if interval == self.interval:
+            return
+        self.interval = interval
+        if self._unsub:
+            self._unsub()
+            self._unsub = None
+            self.async_start()
+
+    @callback
+    def _schedule(self):
+        seconds = self.interval.total_seconds()
+        # 抖动只叠加在本周期, 不累积到基准相位上, 避免长期漂移后重新扎堆
+        jitter = random.uniform(-JITTER_RATIO, JITTER_RATIO) * seconds
+        delay = max(0.0, self._next_due - time.monotonic() + jitter)
+        self._unsub = async_call_later(self._scheduler.hass, delay, self._async_fire)
+
+    def is_stalled(self, now: float) -> bool:
+        """定时器已丢失, 或超过 3 个周期没有触发"""
+        if self._scheduler._handles.get(self.key) is not self or self._unsub is None:
+            return True
+        last = self.last_fired or self.started
+        return now - last > 3 * self.interval.total_seconds()
+
+    async def _async_fire(self, now):
+        self._unsub = None
+        self.last_fired = time.monotonic()
+        self._next_due += self.interval.total_seconds()
+        # 落后太多 (例如系统挂起) 时直接对齐到下一个相位点, 不补发
+        if self._next_due < time.monotonic():
+            self._next_due = time.monotonic() + self.phase * self.interval.total_seconds()
+        self._schedule()
+        await self._scheduler._async_run(self._action, now)
+
+
+class PollScheduler:
+    """为同一账号下的设备分配错开的轮询相位, 并统计云端请求的突发并发"""
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._handles = {}
+        self._slot = 0
+        self._in_flight = 0
+        self._burst_started = 0.0
+        self._burst_size = 0
+        self.peak_concurrency = 0
+        self.last_burst = 0
+        self.peak_burst = 0
+
+    @callback
+    def async_register(self, key, interval: timedelta, action) -> PollHandle:
+        """注册设备轮询, 返回可取消的句柄"""
+        old = self._handles.pop(key, None)
+        if old:
+            old.async_cancel()
+
+        phase = (self._slot * _GOLDEN_RATIO) % 1.0
+        self._slot += 1
+
+        handle = PollHandle(self, key, interval, phase, action)
+        self._handles[key] = handle
+        handle.async_start()
+        _LOGGER.debug("Poll %s scheduled at phase %.3f of %s", key, phase, interval)
+        return handle
+
+    async def _async_run(self, action, now):
+        loop_now = time.monotonic()
+        if loop_now - self._burst_started > BURST_WINDOW:
+            self.last_burst = self._burst_size
+            self._burst_started = loop_now
+            self._burst_size = 0
+        self._burst_size += 1
+        self.peak_burst = max(self.peak_burst, self._burst_size)
+
+        self._in_flight += 1
+        self.peak_concurrency = max(self.peak_concurrency, self._in_flight)
+        try:
+            await action(now)
+        finally:
+            self._in_flight -= 1
+
+    @property
+    def expected_polls_per_minute(self) -> float:
+        return sum(60 / h.interval.total_seconds() for h in self._handles.values())
+
+    def as_dict(self) -> dict:
+        """诊断信息"""
+        return {
+            "devices": len(self._handles),
+            "expected_polls_per_minute": round(self.expected_polls_per_minute, 2),
+            "jitter_ratio": JITTER_RATIO,
+            "in_flight": self._in_flight,
+            "peak_concurrency": self.peak_concurrency,
+            "last_burst": self.last_burst,
+            "peak_burst": self.peak_burst,
+            "phases": {
+                str(key): round(handle.phase * handle.interval.total_seconds(), 2)
+                for key, handle in self._handles.items()
+            },
+        }
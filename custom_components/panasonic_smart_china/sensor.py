@@ -0,0 +1,92 @@
+"""空调运行时长传感器 (由轮询数据累加, total_increasing)"""
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.const import UnitOfTime
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import (
+    CONF_DEVICE_ID, CONF_CONTROLLER_MODEL, DEFAULT_CONTROLLER_MODEL, CONF_DEVICE_TYPE,
+    DEVICE_TYPE_AC,
+)
+from .controllers import SUPPORTED_CONTROLLERS
+from .counters import SIGNAL_COUNTERS_UPDATED, async_get_counters
+
+
+async def async_setup_entry(hass, entry, async_add_entities):
+    """为空调创建运行时长与各模式时长传感器"""
+    config = entry.data
+    if config.get(CONF_DEVICE_TYPE, DEVICE_TYPE_AC) != DEVICE_TYPE_AC:
+        return
+
+    model = config.get(CONF_CONTROLLER_MODEL, DEFAULT_CONTROLLER_MODEL)
+    profile = SUPPORTED_CONTROLLERS.get(model) or list(SUPPORTED_CONTROLLERS.values())[0]
+    # 计数器中的 windSet 以字符串为键 (JSON 持久化), 这里保持一致
+    fan_names = {str(val): name for name, val in profile.get("fan_mapping", {}).items()}
+
+    device_id = config[CONF_DEVICE_ID]
+    counters = async_get_counters(hass)
+    entities = [PanasonicRuntimeSensor(counters, device_id, entry.title, None, fan_names)]
+    for hvac_mode, run_mode in profile.get("hvac_mapping", {}).items():
+        entities.append(
+            PanasonicRuntimeSensor(counters, device_id, entry.title, (str(hvac_mode), run_mode))
+        )
+    async_add_entities(entities)
+
+
+class PanasonicRuntimeSensor(SensorEntity):
+    """累计运行小时数; mode 为 None 时统计总运行时长"""
+
+    _attr_should_poll = False
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = UnitOfTime.HOURS
+    _attr_suggested_display_precision = 1
+
+    def __init__(self, counters, device_id, name, mode=None, fan_names=None):
+        self._counters = counters
+        self._device_id = device_id
+        self._mode = mode
+        self._fan_names = fan_names or {}
+        if mode is None:
+            self._attr_name = f"{name} 运行时长"
+            self._attr_unique_id = f"panasonic_{device_id}_runtime"
+        else:
+            self._attr_name = f"{name} {mode[0]} 时长"
+            self._attr_unique_id = f"panasonic_{device_id}_runtime_{mode[0]}"
+
+    async def async_added_to_hass(self):
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_COUNTERS_UPDATED.format(self._device_id),
+                self._async_counters_updated,
+            )
+        )
+
+    @callback
+    def _async_counters_updated(self):
+        self.async_write_ha_state()
+
+    @property
+    def native_value(self):
+        counters = self._counters.get(self._device_id)
+        if self._mode is None:
+            seconds = counters["on"]
+        else:
+            seconds = counters["modes"].get(str(self._mode[1]), 0.0)
+        return round(seconds / 3600, 3)
+
+    @property
+    def extra_state_attributes(self):
+        if self._mode is not None or not self._fan_names:
+            return None
+        # 各风速档位的累计小时数
+        winds = self._counters.get(self._device_id)["winds"]
+        return {
+            f"fan_{self._fan_names.get(wind, wind)}_hours": round(seconds / 3600, 3)
+            for wind, seconds in winds.items()
+        }
@@ -0,0 +1,290 @@
+"""集成级服务"""
+import asyncio
+import logging
+import time
+
+import voluptuous as vol
+
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN, MIN_TEMP, MAX_TEMP, MIN_HUMIDITY, MAX_HUMIDITY
+from .profiler import RESPONSE_ROWS, async_start_profile, async_stop_profile
+from .trace import DEFAULT_TRACE_SIZE, WireTracer
+from .transport import (
+    async_start_capture,
+    async_start_replay,
+    async_stop_capture,
+    async_stop_replay,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_BULK_COMMAND = "bulk_command"
+SERVICE_START_CAPTURE = "start_capture"
+SERVICE_STOP_CAPTURE = "stop_capture"
+SERVICE_START_REPLAY = "start_replay"
+SERVICE_STOP_REPLAY = "stop_replay"
+SERVICE_CONFIGURE_TRACE = "configure_trace"
+SERVICE_START_PROFILE = "start_profile"
+SERVICE_STOP_PROFILE = "stop_profile"
+SERVICE_GET_HISTORY = "get_history"
+
+ATTR_MAX_CONCURRENCY = "max_concurrency"
+ATTR_MAX_AGE = "max_age"
+ATTR_FILENAME = "filename"
+ATTR_DURATION = "duration"
+ATTR_WINDOW = "window"
+ATTR_REALTIME = "realtime"
+
+ATTR_ENABLED = "enabled"
+ATTR_SIZE = "size"
+ATTR_SAMPLE_RATE = "sample_rate"
+
+DEFAULT_CAPTURE_FILENAME = f"{DOMAIN}_capture.jsonl"
+DEFAULT_PROFILE_FILENAME = f"{DOMAIN}_profile.txt"
+DEFAULT_PROFILE_DURATION = 60
+
+# 批量服务支持的变更字段, 由各实体的 build_changes 解释
+CHANGE_FIELDS = ("power", "hvac_mode", "temperature", "fan_mode", "humidity", "mode")
+
+DEFAULT_MAX_CONCURRENCY = 8
+# 默认复用 30 秒内轮询到的状态, 不再额外读取
+DEFAULT_MAX_AGE = 30
+
+BULK_COMMAND_SCHEMA = vol.Schema({
+    vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+    vol.Optional("power"): cv.boolean,
+    vol.Optional("hvac_mode"): cv.string,
+    vol.Optional("temperature"): vol.All(
+        vol.Coerce(float), vol.Range(min=MIN_TEMP, max=MAX_TEMP)
+    ),
+    vol.Optional("fan_mode"): cv.string,
+    vol.Optional("humidity"): vol.All(
+        vol.Coerce(int), vol.Range(min=MIN_HUMIDITY, max=MAX_HUMIDITY)
+    ),
+    vol.Optional("mode"): cv.string,
+    vol.Optional(ATTR_MAX_CONCURRENCY, default=DEFAULT_MAX_CONCURRENCY): vol.All(
+        vol.Coerce(int), vol.Range(min=1, max=64)
+    ),
+    vol.Optional(ATTR_MAX_AGE, default=DEFAULT_MAX_AGE): vol.All(
+        vol.Coerce(float), vol.Range(min=0)
+    ),
+})
+
+START_CAPTURE_SCHEMA = vol.Schema({
+    # 只允许文件名, 不允许路径
+    vol.Optional(ATTR_FILENAME, default=DEFAULT_CAPTURE_FILENAME): vol.All(
+        cv.string, vol.Match(r"^[^/\\]+$")
+    ),
+    vol.Optional(ATTR_DURATION): vol.All(vol.Coerce(int), vol.Range(min=1, max=86400)),
+})
+
+START_REPLAY_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_FILENAME, default=DEFAULT_CAPTURE_FILENAME): vol.All(
+        cv.string, vol.Match(r"^[^/\\]+$")
+    ),
+    # 按录制时的耗时延迟返回; 关闭后立即返回
+    vol.Optional(ATTR_REALTIME, default=True): cv.boolean,
+})
+
+START_PROFILE_SCHEMA = vol.Schema({
+    vol.Optional(ATTR_FILENAME, default=DEFAULT_PROFILE_FILENAME): vol.All(
+        cv.string, vol.Match(r"^[^/\\]+$")
+    ),
+    # 剖析会话必须限时, 避免忘记关闭
+    vol.Optional(ATTR_DURATION, default=DEFAULT_PROFILE_DURATION): vol.All(
+        vol.Coerce(int), vol.Range(min=1, max=3600)
+    ),
+})
+
+GET_HISTORY_SCHEMA = vol.Schema({
+    vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+    # 只返回最近多少秒内的样本, 不填返回缓冲区全部
+    vol.Optional(ATTR_WINDOW): vol.All(vol.Coerce(int), vol.Range(min=1)),
+})
+
+CONFIGURE_TRACE_SCHEMA = vol.Schema({
+    vol.Required(ATTR_ENABLED): cv.boolean,
+    vol.Optional(ATTR_SIZE, default=DEFAULT_TRACE_SIZE): vol.All(
+        vol.Coerce(int), vol.Range(min=1, max=1000)
+    ),
+    vol.Optional(ATTR_SAMPLE_RATE, default=1.0): vol.All(
+        vol.Coerce(float), vol.Range(min=0, max=1)
+    ),
+})
+
+
+def async_setup_services(hass: HomeAssistant):
+    """注册集成服务"""
+
+    async def async_bulk_command(call: ServiceCall):
+        """对一组设备并发执行同一组变更, 返回每台设备的结果"""
+        change_set = {k: call.data[k] for k in CHANGE_FIELDS if k in call.data}
+        semaphore = asyncio.Semaphore(call.data[ATTR_MAX_CONCURRENCY])
+        max_age = call.data[ATTR_MAX_AGE]
+
+        by_entity_id = {
+            entity.entity_id: entity
+            for entity in hass.data[DOMAIN].get("entities", {}).values()
+        }
+
+        async def _run(entity_id):
+            entity = by_entity_id.get(entity_id)
+            if entity is None:
+                return {"success": False, "error": "not_found"}
+            try:
+                changes = entity.build_changes(change_set)
+            except ValueError as err:
+                # 未知模式绝不回退到默认模式 (例如 "关闭" 变成 "制冷")
+                return {"success": False, "error": "invalid_mode", "detail": str(err)}
+            if not changes:
+                return {"success": False, "error": "no_applicable_changes"}
+            try:
+                async with semaphore:
+                    ok = await entity.async_send_changes(changes, max_age=max_age)
+            except Exception as err:  # 单台设备异常不影响其他设备的结果
+                _LOGGER.exception("Bulk command failed for %s", entity_id)
+                return {"success": False, "error": str(err) or type(err).__name__}
+            return {"success": ok} if ok else {"success": False, "error": "write_failed"}
+
+        entity_ids = call.data[ATTR_ENTITY_ID]
+        results = await asyncio.gather(*(_run(entity_id) for entity_id in entity_ids))
+        response = dict(zip(entity_ids, results))
+
+        failed = [entity_id for entity_id, res in response.items() if not res["success"]]
+        if failed:
+            _LOGGER.warning("Bulk command failed for %s", failed)
+        return {"results": response}
+
+    async def async_start_capture_service(call: ServiceCall):
+        """开始录制云端请求 (脱敏), 可选定时自动停止"""
+        await async_stop_capture(hass)
+        recorder = async_start_capture(hass, hass.config.path(call.data[ATTR_FILENAME]))
+
+        if ATTR_DURATION in call.data:
+            async def _auto_stop(now):
+                await async_stop_capture(hass, recorder)
+
+            async_call_later(hass, call.data[ATTR_DURATION], _auto_stop)
+
+    async def async_stop_capture_service(call: ServiceCall):
+        path, entries = await async_stop_capture(hass)
+        return {"path": path, "entries": entries}
+
+    async def async_start_replay_service(call: ServiceCall):
+        """用录制的 cassette 代替云端应答 (离线复现问题/基准测试)"""
+        path = hass.config.path(call.data[ATTR_FILENAME])
+        try:
+            player = await async_start_replay(hass, path, call.data[ATTR_REALTIME])
+        except (OSError, ValueError, KeyError) as err:
+            raise HomeAssistantError(f"Cannot load cassette {path}: {err}") from err
+        return {"path": path, "entries": player.entries}
+
+    async def async_stop_replay_service(call: ServiceCall):
+        async_stop_replay(hass)
+
+    async def async_start_profile_service(call: ServiceCall):
+        """开始限时剖析; 已有会话时先结束并保存"""
+        await async_stop_profile(hass)
+        session = async_start_profile(hass, hass.config.path(call.data[ATTR_FILENAME]))
+
+        async def _auto_stop(now):
+            await async_stop_profile(hass, session)
+
+        async_call_later(hass, call.data[ATTR_DURATION], _auto_stop)
+
+    async def async_stop_profile_service(call: ServiceCall):
+        """提前结束剖析, 返回累计耗时最高的函数"""
+        session = await async_stop_profile(hass)
+        if session is None:
+            return {"path": None, "functions": []}
+        return {
+            "path": session.path,
+            "duration": round(session.duration, 1),
+            "functions": session.rows[:RESPONSE_ROWS],
+        }
+
+    async def async_get_history(call: ServiceCall):
+        """读取设备内存中的近期遥测, 不查询数据库"""
+        since = None
+        if ATTR_WINDOW in call.data:
+            since = time.time() - call.data[ATTR_WINDOW]
+        by_entity_id = {
+            entity.entity_id: entity
+            for entity in hass.data[DOMAIN].get("entities", {}).values()
+        }
+        return {
+            entity_id: by_entity_id[entity_id].history.as_dict(since)
+            for entity_id in call.data[ATTR_ENTITY_ID]
+            if entity_id in by_entity_id
+        }
+
+    async def async_configure_trace(call: ServiceCall):
+        """开启/关闭请求追踪; 关闭后缓冲区保留, 仍可通过诊断导出"""
+        tracer = hass.data[DOMAIN].get("trace")
+        if tracer is None:
+            if not call.data[ATTR_ENABLED]:
+                return
+            tracer = hass.data[DOMAIN]["trace"] = WireTracer()
+        tracer.configure(call.data[ATTR_ENABLED], call.data[ATTR_SIZE], call.data[ATTR_SAMPLE_RATE])
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CONFIGURE_TRACE,
+        async_configure_trace,
+        schema=CONFIGURE_TRACE_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_START_REPLAY,
+        async_start_replay_service,
+        schema=START_REPLAY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_REPLAY,
+        async_stop_replay_service,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_HISTORY,
+        async_get_history,
+        schema=GET_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_START_PROFILE,
+        async_start_profile_service,
+        schema=START_PROFILE_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_PROFILE,
+        async_stop_profile_service,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_START_CAPTURE,
+        async_start_capture_service,
+        schema=START_CAPTURE_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_CAPTURE,
+        async_stop_capture_service,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BULK_COMMAND,
+        async_bulk_command,
+        schema=BULK_COMMAND_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
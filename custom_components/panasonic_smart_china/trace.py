@@ -0,0 +1,71 @@
+"""请求追踪: 按设备保存最近的请求/响应摘要 (环形缓冲), 通过诊断导出"""
+import random
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+DEFAULT_TRACE_SIZE = 50
+# 不带 deviceId 的请求 (登录、设备列表) 归入该键
+ACCOUNT_KEY = "_account"
+
+
+def async_get_tracer(hass: HomeAssistant):
+    """返回已启用的追踪器, 未启用时返回 None"""
+    tracer = hass.data.get(DOMAIN, {}).get("trace")
+    if tracer is not None and tracer.enabled:
+        return tracer
+    return None
+
+
+class WireTracer:
+    """每台设备一个定长 deque, 只保存摘要而非完整报文"""
+
+    def __init__(self, size=DEFAULT_TRACE_SIZE, sample_rate=1.0):
+        self.enabled = True
+        self.size = size
+        self.sample_rate = sample_rate
+        self._buffers = {}
+
+    def configure(self, enabled, size, sample_rate):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        if size != self.size:
+            self.size = size
+            self._buffers = {k: deque(v, maxlen=size) for k, v in self._buffers.items()}
+
+    def record(self, url, payload, data=None, elapsed=0.0, error=None):
+        """记录一次交互; 成功的请求按采样率抽样, 失败的请求总是记录"""
+        if error is None and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+
+        device_id = payload.get("deviceId") or ACCOUNT_KEY
+        entry = {
+            "ts": round(time.time(), 3),
+            "endpoint": urlparse(url).path.rsplit("/", 1)[-1],
+            "ms": round(elapsed * 1000),
+        }
+        params = payload.get("params")
+        if isinstance(params, dict) and device_id != ACCOUNT_KEY:
+            entry["params"] = len(params)
+        if error is not None:
+            entry["error"] = repr(error)
+        elif isinstance(data, dict):
+            if data.get("errorCode"):
+                entry["errorCode"] = data["errorCode"]
+            results = data.get("results")
+            if isinstance(results, dict):
+                entry["results"] = len(results)
+
+        buf = self._buffers.get(device_id)
+        if buf is None:
+            buf = self._buffers[device_id] = deque(maxlen=self.size)
+        buf.append(entry)
+
+    def dump(self, device_id=None):
+        if device_id is not None:
+            return list(self._buffers.get(device_id, ()))
+        return {k: list(v) for k, v in self._buffers.items()}
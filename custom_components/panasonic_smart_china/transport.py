@@ -0,0 +1,175 @@
+"""云端 HTTP 请求通道, 支持抓包录制 (cassette) 与离线回放"""
+import asyncio
+import json
+import logging
+import time
+from urllib.parse import urlparse
+
+import async_timeout
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .trace import async_get_tracer
+
+_LOGGER = logging.getLogger(__name__)
+
+# 录制时需要脱敏的字段 (token / SSID / 密码 / 账号)
+REDACT_KEYS = {"token", "SSID", "ssId", "ssid", "pwd", "usrId"}
+REDACTED = "**REDACTED**"
+# 单个 cassette 最多记录的交互条数
+MAX_CAPTURE_ENTRIES = 5000
+
+
+async def async_post_json(
+    hass: HomeAssistant, session, url: str, payload: dict, headers: dict, timeout=None
+) -> dict:
+    """POST 并返回 JSON; 所有访问松下云端的请求都经过这里"""
+    domain_data = hass.data.get(DOMAIN, {})
+
+    player = domain_data.get("replay")
+    if player is not None:
+        return await player.async_serve(url, payload)
+
+    tracer = async_get_tracer(hass)
+    started = time.monotonic()
+    try:
+        if timeout:
+            async with async_timeout.timeout(timeout):
+                data = await _async_post(session, url, payload, headers)
+        else:
+            data = await _async_post(session, url, payload, headers)
+    except Exception as err:
+        if tracer is not None:
+            tracer.record(url, payload, elapsed=time.monotonic() - started, error=err)
+        raise
+
+    elapsed = time.monotonic() - started
+    if tracer is not None:
+        tracer.record(url, payload, data, elapsed)
+    recorder = domain_data.get("capture")
+    if recorder is not None:
+        recorder.record(url, payload, data, elapsed)
+    return data
+
+
+async def _async_post(session, url, payload, headers):
+    async with session.post(url, json=payload, headers=headers, ssl=False) as resp:
+        resp.raise_for_status()
+        return await resp.json(content_type=None)
+
+
+def redact(data):
+    """递归脱敏"""
+    if isinstance(data, dict):
+        return {
+            k: (REDACTED if k in REDACT_KEYS else redact(v)) for k, v in data.items()
+        }
+    if isinstance(data, list):
+        return [redact(v) for v in data]
+    return data
+
+
+class CassetteRecorder:
+    """在内存中录制请求/响应, 停止时一次性写入 JSON Lines 文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._started = time.monotonic()
+        self._entries = []
+        self.dropped = 0
+
+    def record(self, url, payload, data, elapsed):
+        if len(self._entries) >= MAX_CAPTURE_ENTRIES:
+            self.dropped += 1
+            return
+        self._entries.append({
+            "t": round(time.monotonic() - self._started, 3),  # 相对录制开始的时间
+            "d": round(elapsed, 3),  # 请求耗时
+            "u": urlparse(url).path,
+            "q": redact(payload),
+            "r": redact(data),
+        })
+
+    def __len__(self):
+        return len(self._entries)
+
+    def save(self):
+        """写入文件 (阻塞 IO, 需在 executor 中调用)"""
+        with open(self.path, "w", encoding="utf-8") as f:
+            for entry in self._entries:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+                f.write("\n")
+
+
+class CassettePlayer:
+    """按端点与设备回放录制的响应, 并按原始耗时延迟返回"""
+
+    def __init__(self, entries, realtime=True):
+        self._realtime = realtime
+        self.entries = 0
+        self._queues = {}
+        self._cursors = {}
+        for entry in entries:
+            self._queues.setdefault(self._key(entry["u"], entry["q"]), []).append(entry)
+            self.entries += 1
+
+    @classmethod
+    def from_file(cls, path: str, realtime=True) -> "CassettePlayer":
+        """读取 cassette 文件 (阻塞 IO)"""
+        with open(path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        return cls(entries, realtime)
+
+    @staticmethod
+    def _key(path, payload):
+        device_id = None
+        if isinstance(payload, dict):
+            device_id = payload.get("deviceId")
+        return path, device_id
+
+    async def async_serve(self, url: str, payload: dict) -> dict:
+        key = self._key(urlparse(url).path, payload)
+        entries = self._queues.get(key) or self._queues.get((key[0], None))
+        if not entries:
+            raise LookupError(f"No recorded interaction for {key}")
+        # 按录制顺序循环回放
+        cursor = self._cursors.get(key, 0)
+        self._cursors[key] = cursor + 1
+        entry = entries[cursor % len(entries)]
+        if self._realtime and entry["d"]:
+            await asyncio.sleep(entry["d"])
+        return entry["r"]
+
+
+def async_start_capture(hass: HomeAssistant, path: str) -> CassetteRecorder:
+    recorder = hass.data[DOMAIN]["capture"] = CassetteRecorder(path)
+    _LOGGER.info("Traffic capture started: %s", path)
+    return recorder
+
+
+async def async_stop_capture(hass: HomeAssistant, recorder=None):
+    """停止录制并落盘, 返回 (文件路径, 条数)
+
+    recorder: 只停止指定的录制 (定时自动停止时使用, 避免误停后来开启的录制)
+    """
+    current = hass.data[DOMAIN].get("capture")
+    if current is None or (recorder is not None and current is not recorder):
+        return None, 0
+    recorder = hass.data[DOMAIN].pop("capture")
+    await hass.async_add_executor_job(recorder.save)
+    _LOGGER.info("Traffic capture saved: %s (%d entries)", recorder.path, len(recorder))
+    return recorder.path, len(recorder)
+
+
+async def async_start_replay(hass: HomeAssistant, path: str, realtime=True) -> CassettePlayer:
+    """用 cassette 替代真实云端 (基准测试/回归测试)"""
+    player = await hass.async_add_executor_job(CassettePlayer.from_file, path, realtime)
+    hass.data[DOMAIN]["replay"] = player
+    _LOGGER.warning("Replaying recorded cloud traffic from %s", path)
+    return player
+
+
+def async_stop_replay(hass: HomeAssistant) -> bool:
+    """恢复访问真实云端, 返回之前是否处于回放状态"""
+    return hass.data[DOMAIN].pop("replay", None) is not None
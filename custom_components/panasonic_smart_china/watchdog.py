@@ -0,0 +1,54 @@
+"""轮询看门狗: 整个集成共用一个定时器, 检查轮询是否停止、数据是否过旧"""
+import logging
+import time
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import issue_registry as ir
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+WATCHDOG_INTERVAL = timedelta(seconds=60)
+# 连续这么多个轮询周期没有成功 (且至少 STALE_MIN_SECONDS 秒) 视为数据过旧
+STALE_POLLS = 10
+STALE_MIN_SECONDS = 600
+
+
+@callback
+def async_setup_watchdog(hass: HomeAssistant):
+    """启动看门狗, 返回取消函数"""
+
+    @callback
+    def _async_check(_now):
+        now = time.monotonic()
+        for device_id, entity in list(hass.data[DOMAIN].get("entities", {}).items()):
+            interval = entity._polling_interval.total_seconds()
+            stale_after = max(STALE_POLLS * interval, STALE_MIN_SECONDS)
+            age = entity.async_watchdog_check(now, stale_after)
+
+            if age is None:
+                async_delete_stale_issue(hass, device_id)
+                continue
+            ir.async_create_issue(
+                hass,
+                DOMAIN,
+                f"stale_{device_id}",
+                is_fixable=False,
+                severity=ir.IssueSeverity.WARNING,
+                translation_key="stale_device",
+                translation_placeholders={
+                    "name": entity.name or device_id,
+                    "minutes": str(int(age // 60)),
+                },
+            )
+
+    return async_track_time_interval(hass, _async_check, WATCHDOG_INTERVAL)
+
+
+@callback
+def async_delete_stale_issue(hass: HomeAssistant, device_id):
+    """设备恢复或被移除时删除对应的修复提示"""
+    ir.async_delete_issue(hass, DOMAIN, f"stale_{device_id}")